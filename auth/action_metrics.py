@@ -0,0 +1,252 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+
+class CountMinSketch:
+    """Fixed-size frequency estimator; never underestimates, overestimates by ~total * e / width"""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+
+    def _indexes(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width
+
+    def add(self, key, amount=1):
+        for row, index in self._indexes(key):
+            self._rows[row][index] += amount
+
+    def estimate(self, key):
+        return min(self._rows[row][index] for row, index in self._indexes(key))
+
+    def to_bytes(self):
+        return b''.join(row.tobytes() for row in self._rows)
+
+    def merge_bytes(self, data):
+        """Add a sketch of the same shape serialized by ``to_bytes``"""
+        other = array('Q', data)
+        if len(other) != self.width * self.depth:
+            raise ValueError('Sketch shape mismatch')
+        for row in range(self.depth):
+            counts = self._rows[row]
+            offset = row * self.width
+            for index in range(self.width):
+                counts[index] += other[offset + index]
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in ``k`` counters (Metwally et al.).
+
+    A new key evicts the smallest counter and inherits its count as the
+    ``error`` bound, so every true heavy hitter with frequency above
+    total / k is guaranteed to be tracked.
+    """
+
+    def __init__(self, k=20):
+        self.k = k
+        self._counters = {}
+
+    def add(self, key, amount=1):
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += amount
+        elif len(self._counters) < self.k:
+            self._counters[key] = [amount, 0]
+        else:
+            victim = min(self._counters, key=lambda k: self._counters[k][0])
+            floor = self._counters.pop(victim)[0]
+            self._counters[key] = [floor + amount, floor]
+
+    @property
+    def floor(self):
+        """Upper bound of the count of any untracked key: the smallest counter once all k are used"""
+        if len(self._counters) < self.k:
+            return 0
+        return min(count for count, _ in self._counters.values())
+
+    def top(self, n=None):
+        """``[(key, count, error)]`` sorted by estimated count, highest first"""
+        items = sorted(self._counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, count, error) for key, (count, error) in items[:n]]
+
+    def merge(self, counters, floor):
+        """Add another summary given as ``{key: [count, error]}`` and its ``floor``.
+
+        A key missing from one side may still have been counted there up to that
+        side's floor, which is added to its count and error; the k largest are kept.
+        """
+        own_floor = self.floor
+        merged = {}
+        for key in self._counters.keys() | counters.keys():
+            count, error = self._counters.get(key, (own_floor, own_floor))
+            other_count, other_error = counters.get(key, (floor, floor))
+            merged[key] = [count + other_count, error + other_error]
+        top = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:self.k]
+        self._counters = dict(top)
+
+
+class UserActionTracker:
+    """Per-user action counts in memory independent of the number of users.
+
+    Top users come from a space-saving summary; per-user, per-action counts
+    for any user are count-min sketch estimates. Trackers of several worker
+    processes are combined with ``state``/``merge``.
+    """
+
+    def __init__(self, top_k=20, width=2048, depth=4):
+        self.top_k = top_k
+        self._heavy = SpaceSaving(top_k)
+        self._sketch = CountMinSketch(width, depth)
+        self._totals = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def record(self, user, action, amount=1):
+        with self._lock:
+            self._heavy.add(user, amount)
+            self._sketch.add(f'{action}\0{user}', amount)
+            self._totals[action] = self._totals.get(action, 0) + amount
+            self.version += 1
+
+    def user_actions(self, user):
+        with self._lock:
+            return {action: self._sketch.estimate(f'{action}\0{user}') for action in self._totals}
+
+    def snapshot(self, n=None, breakdown=True):
+        """Top users with per-action breakdown, plus everything else as 'other'"""
+        with self._lock:
+            top = self._heavy.top(n)
+            total = sum(self._totals.values())
+            users = [{
+                'user': user,
+                'count': count,
+                'error': error,
+                'actions': {a: self._sketch.estimate(f'{a}\0{user}') for a in self._totals}
+            } if breakdown else {'user': user, 'count': count, 'error': error} for user, count, error in top]
+        return {
+            'total': total,
+            'users': users,
+            'other': max(0, total - sum(u['count'] for u in users))
+        }
+
+    def state(self, sketch=True):
+        """``(summary, sketch bytes or None)``; the summary is JSON-serializable"""
+        with self._lock:
+            summary = {
+                'shape': [self.top_k, self._sketch.width, self._sketch.depth],
+                'heavy': {key: list(counter) for key, counter in self._heavy._counters.items()},
+                'floor': self._heavy.floor,
+                'totals': dict(self._totals),
+            }
+            return summary, self._sketch.to_bytes() if sketch else None
+
+    def merge(self, summary, sketch=None):
+        with self._lock:
+            self._heavy.merge(summary['heavy'], summary['floor'])
+            for action, count in summary['totals'].items():
+                self._totals[action] = self._totals.get(action, 0) + count
+            if sketch is not None:
+                self._sketch.merge_bytes(sketch)
+            self.version += 1
+
+
+class TrackerFiles:
+    """``UserActionTracker`` states of every worker process, shared through a directory.
+
+    Each worker saves its own state as ``user_actions_<pid>.json`` (summary)
+    and ``.cms`` (sketch) and reads the others' to answer for the whole
+    service. The states of exited workers are folded into a single archive
+    by ``archive(pid)``, so recycled workers keep counting.
+    """
+
+    PREFIX = 'user_actions_'
+    ARCHIVE = 'archive'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name, ext):
+        return os.path.join(self.directory, f'{self.PREFIX}{name}.{ext}')
+
+    def _write(self, path, data):
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def save(self, tracker, name=None):
+        summary, sketch = tracker.state()
+        name = name or os.getpid()
+        # Sketch first: a reader pairing a new summary with an older sketch only underestimates
+        self._write(self._path(name, 'cms'), sketch)
+        self._write(self._path(name, 'json'), json.dumps(summary).encode())
+
+    def load(self, sketch=True, exclude=None):
+        """``[(summary, sketch or None)]`` of every saved state except ``exclude``"""
+        states = []
+        for path in glob.glob(self._path('*', 'json')):
+            name = os.path.basename(path)[len(self.PREFIX):-len('.json')]
+            if name == str(exclude):
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    summary = json.loads(f.read())
+                data = None
+                if sketch:
+                    with open(self._path(name, 'cms'), 'rb') as f:
+                        data = f.read()
+            except (OSError, ValueError):
+                # Being archived or replaced right now
+                continue
+            states.append((summary, data))
+        return states
+
+    def merged(self, tracker, sketch=True):
+        """A tracker combining ``tracker`` (this process, live) with every other saved state"""
+        combined = UserActionTracker(tracker.top_k, tracker._sketch.width, tracker._sketch.depth)
+        combined.merge(*tracker.state(sketch))
+        for state in self.load(sketch, exclude=os.getpid()):
+            try:
+                combined.merge(*state)
+            except ValueError:
+                logger.warning('Skipping user action state with a different sketch shape')
+        return combined
+
+    def archive(self, pid):
+        """Fold the state of exited worker ``pid`` into the archive (called by one process only)"""
+        try:
+            with open(self._path(pid, 'json'), 'rb') as f:
+                summary = json.loads(f.read())
+            with open(self._path(pid, 'cms'), 'rb') as f:
+                sketch = f.read()
+        except FileNotFoundError:
+            return
+        archived = UserActionTracker(*summary['shape'])
+        archived.merge(summary, sketch)
+        try:
+            with open(self._path(self.ARCHIVE, 'json'), 'rb') as f:
+                archive_summary = json.loads(f.read())
+            with open(self._path(self.ARCHIVE, 'cms'), 'rb') as f:
+                archived.merge(archive_summary, f.read())
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning('Dropping archived user actions with a different sketch shape')
+        # The dead worker's files go first: briefly undercounting beats counting it twice
+        for ext in ('json', 'cms'):
+            os.remove(self._path(pid, ext))
+        self.save(archived, self.ARCHIVE)
+
+    def clear(self):
+        for path in glob.glob(self._path('*', '*')):
+            os.remove(path)
@@ -0,0 +1,117 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued; ``reason`` is 'queue_full' or 'timeout'"""
+
+    def __init__(self, reason):
+        super().__init__(f'Request shed: {reason}')
+        self.reason = reason
+
+
+class RateLimiter:
+    """Token buckets keyed by client (user or IP address).
+
+    Each key refills at ``rate`` tokens per second up to ``burst``. At most
+    ``max_keys`` buckets are kept; the least recently seen are forgotten,
+    which only ever makes a forgotten client start again with a full bucket.
+    A ``rate`` of 0 disables the limiter.
+    """
+
+    def __init__(self, rate, burst=None, max_keys=100000):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def acquire(self, key, cost=1.0):
+        """Return 0 if ``key`` may proceed, otherwise the seconds until it may retry"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(key)
+            if tokens >= cost:
+                self._buckets[key] = [tokens - cost, now]
+                return 0.0
+            self._buckets[key] = [tokens, now]
+        return (cost - tokens) / self.rate
+
+
+def retry_after(seconds):
+    """Retry-After header value (whole seconds, at least 1)"""
+    return str(max(1, math.ceil(seconds)))
+
+
+class ConcurrencyLimiter:
+    """Caps requests running at once, with a bounded queue and a latency budget.
+
+    Up to ``limit`` callers hold a slot; up to ``max_queue`` more wait for one.
+    A caller arriving at a full queue is shed at once, and a queued caller
+    that has not got a slot within ``timeout`` seconds (the queueing latency
+    budget) is shed as well, so overload turns into fast rejections instead
+    of every request getting slower.
+    """
+
+    def __init__(self, limit, max_queue, timeout, on_wait=None):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._on_wait = on_wait
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def acquire(self):
+        with self._cond:
+            if self._active < self.limit and self._waiting == 0:
+                self._active += 1
+                return
+            if self._waiting >= self.max_queue:
+                raise Overloaded('queue_full')
+            self._waiting += 1
+            started = time.monotonic()
+            try:
+                if not self._cond.wait_for(lambda: self._active < self.limit, self.timeout):
+                    raise Overloaded('timeout')
+                self._active += 1
+            finally:
+                self._waiting -= 1
+                if self._on_wait:
+                    self._on_wait(time.monotonic() - started)
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,191 @@
+import datetime
+import json
+
+from psycopg2.extras import execute_values
+
+# Writable resource columns and the SQL type their values are cast to
+WRITABLE_COLUMNS = {
+    'name': 'text',
+    'author': 'text',
+    'annotation': 'text',
+    'kind': 'text',
+    'purpose': 'text',
+    'open_date': 'date',
+    'expiry_date': 'date',
+    'usage_conditions': 'text',
+    'url': 'text',
+}
+
+BULK_MODES = ('atomic', 'partial')
+
+# Resource ids are bigint; larger JSON integers can't refer to a resource
+MAX_ID = 2 ** 63 - 1
+
+
+class BulkError(Exception):
+    """Request-level problem with a bulk payload"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_items(request, max_items):
+    """Read bulk items from a JSON array, ``{"items": [...]}`` or an NDJSON body"""
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                raise BulkError(f'Invalid JSON on line {number}')
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('items')
+        if not isinstance(data, list):
+            raise BulkError('Expected a JSON array of items')
+        items = data
+
+    if not items:
+        raise BulkError('No items provided')
+    if len(items) > max_items:
+        raise BulkError(f'Too many items: {len(items)} > {max_items}', status=413)
+    return items
+
+
+def parse_mode(value, default):
+    mode = value or default
+    if mode not in BULK_MODES:
+        raise BulkError(f'Invalid mode: {mode}')
+    return mode
+
+
+def _check_fields(item):
+    unknown = [k for k in item if k != 'id' and k not in WRITABLE_COLUMNS]
+    if unknown:
+        return 'Unknown fields: ' + ', '.join(sorted(unknown))
+    for field, sql_type in WRITABLE_COLUMNS.items():
+        value = item.get(field)
+        if value is None:
+            continue
+        if sql_type == 'date':
+            try:
+                datetime.date.fromisoformat(value)
+            except (TypeError, ValueError):
+                return f'Invalid date for {field}'
+        elif not isinstance(value, str):
+            return f'{field} must be a string'
+    return None
+
+
+def _check_id(item):
+    resource_id = item.get('id')
+    if not isinstance(resource_id, int) or isinstance(resource_id, bool) or not 1 <= resource_id <= MAX_ID:
+        return 'Missing or invalid field: id'
+    return None
+
+
+def validate_create(items):
+    """Split items into ``[(index, item)]`` valid rows and ``{index: error}``"""
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = 'Item must be an object'
+        elif 'id' in item:
+            errors[index] = 'id must not be provided on create'
+        elif not item.get('name'):
+            errors[index] = 'Missing required field: name'
+        else:
+            error = _check_fields(item)
+            if error:
+                errors[index] = error
+            else:
+                valid.append((index, item))
+    return valid, errors
+
+
+def validate_update(items):
+    valid, errors, seen = [], {}, set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = 'Item must be an object'
+            continue
+        error = _check_id(item) or _check_fields(item)
+        if not error and len(item) == 1:
+            error = 'No fields to update'
+        if not error and item['id'] in seen:
+            error = 'Duplicate id in batch'
+        if error:
+            errors[index] = error
+        else:
+            seen.add(item['id'])
+            valid.append((index, item))
+    return valid, errors
+
+
+def validate_delete(items):
+    valid, errors, seen = [], {}, set()
+    for index, item in enumerate(items):
+        # Plain ids are accepted as well as {"id": ...} objects
+        if not isinstance(item, dict):
+            item = {'id': item}
+        error = _check_id(item)
+        if not error and item['id'] in seen:
+            error = 'Duplicate id in batch'
+        if error:
+            errors[index] = error
+        else:
+            seen.add(item['id'])
+            valid.append((index, item))
+    return valid, errors
+
+
+def insert_many(cursor, valid):
+    """Multi-row INSERT; returns new ids in the order of ``valid``"""
+    columns = list(WRITABLE_COLUMNS)
+    rows = [tuple(item.get(c) for c in columns) for _, item in valid]
+    template = '(' + ', '.join(f'%s::{WRITABLE_COLUMNS[c]}' for c in columns) + ')'
+    result = execute_values(
+        cursor,
+        f"INSERT INTO resources ({', '.join(columns)}) VALUES %s RETURNING id",
+        rows, template=template, page_size=len(rows), fetch=True
+    )
+    return [row[0] for row in result]
+
+
+def update_many(cursor, valid):
+    """UPDATE ... FROM (VALUES ...) grouped by the set of fields.
+
+    Returns ids aligned with ``valid``, None where the resource does not exist.
+    """
+    groups = {}
+    for _, item in valid:
+        fields = tuple(c for c in WRITABLE_COLUMNS if c in item)
+        groups.setdefault(fields, []).append(item)
+
+    updated = set()
+    for fields, group in groups.items():
+        rows = [(item['id'],) + tuple(item[c] for c in fields) for item in group]
+        template = '(%s::bigint, ' + ', '.join(f'%s::{WRITABLE_COLUMNS[c]}' for c in fields) + ')'
+        assignments = ', '.join(f'{c} = v.{c}' for c in fields)
+        result = execute_values(
+            cursor,
+            f"UPDATE resources AS r SET {assignments} "
+            f"FROM (VALUES %s) AS v (id, {', '.join(fields)}) "
+            f"WHERE r.id = v.id RETURNING r.id",
+            rows, template=template, page_size=len(rows), fetch=True
+        )
+        updated.update(row[0] for row in result)
+    return [item['id'] if item['id'] in updated else None for _, item in valid]
+
+
+def delete_many(cursor, valid):
+    """DELETE ... WHERE id = ANY(...); returns ids aligned with ``valid`` like ``update_many``"""
+    ids = [item['id'] for _, item in valid]
+    cursor.execute("DELETE FROM resources WHERE id = ANY(%s) RETURNING id", (ids,))
+    deleted = {row[0] for row in cursor.fetchall()}
+    return [item['id'] if item['id'] in deleted else None for _, item in valid]
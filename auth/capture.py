@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Query parameters whose values are user content or opaque cursors; only their length is kept
+OPAQUE_ARGS = {'q', 'cursor', 'since'}
+MAX_ARG_LENGTH = 100
+
+
+def pseudonym(user):
+    """Stable short identifier for ``user``, so logs keep per-user sequences without emails"""
+    return hashlib.blake2b(user.encode(), digest_size=6).hexdigest()
+
+
+def value_shape(value):
+    """Length of a string; None for any other value"""
+    return len(value) if isinstance(value, str) else None
+
+
+def item_shape(item):
+    return {key: value_shape(value) for key, value in item.items()} if isinstance(item, dict) else None
+
+
+def body_shape(request):
+    """Field names and string lengths of a JSON body; bulk bodies as item count and keys"""
+    if request.mimetype == 'application/x-ndjson':
+        lines = [line for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        try:
+            first = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            first = {}
+        return {'n': len(lines), 'keys': sorted(first) if isinstance(first, dict) else []}
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get('items'), list):
+        data = data['items']
+    if isinstance(data, list):
+        keys = set()
+        for item in data:
+            if isinstance(item, dict):
+                keys.update(item)
+        return {'n': len(data), 'keys': sorted(keys)}
+    return item_shape(data)
+
+
+def args_shape(args):
+    return {
+        key: len(value) if key in OPAQUE_ARGS else value[:MAX_ARG_LENGTH]
+        for key, value in args.items()
+    }
+
+
+def describe(request, response, user, seconds):
+    """One capture record: start time, op, method, user pseudonym, status, duration and payload shape"""
+    entry = {
+        't': round(time.time() - seconds, 6),
+        'op': request.path.split('/', 2)[-1],
+        'm': request.method,
+        'u': pseudonym(user) if user else None,
+        's': response.status_code,
+        'ms': round(seconds * 1000, 3),
+    }
+    if request.args:
+        entry['a'] = args_shape(request.args)
+    if request.content_length:
+        entry['b'] = body_shape(request)
+    return entry
+
+
+class WorkloadCapture:
+    """Append-only NDJSON log of API calls, written in batches by a background thread.
+
+    Records are only formatted on the request path; every ``interval``
+    seconds the pending lines are appended with a single ``write`` on an
+    ``O_APPEND`` descriptor, so several worker processes can share one file
+    without interleaving lines. Capturing stops once the file reaches
+    ``max_bytes``.
+    """
+
+    def __init__(self, path, max_bytes=1 << 30, interval=1.0, on_record=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._on_record = on_record
+        self._pending = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._full = False
+        self._fd = None
+        self._thread = None
+
+    def record(self, entry):
+        if self._full:
+            if self._on_record:
+                self._on_record('dropped')
+            return
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._cond:
+            self._pending.append(line)
+        if self._on_record:
+            self._on_record('captured')
+
+    def flush(self):
+        with self._cond:
+            lines, self._pending = self._pending, []
+        if not lines or self._fd is None:
+            return 0
+        try:
+            if os.fstat(self._fd).st_size >= self.max_bytes:
+                if not self._full:
+                    logger.warning('Workload capture %s reached %d bytes, capture stopped', self.path, self.max_bytes)
+                self._full = True
+                return 0
+            os.write(self._fd, ''.join(lines).encode())
+        except OSError:
+            logger.exception('Failed to write %d capture records', len(lines))
+            return 0
+        return len(lines)
+
+    def start(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._thread = threading.Thread(target=self._run, name='workload-capture', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer and append whatever is still pending"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped, timeout=self.interval)
+                if self._stopped:
+                    return
+            self.flush()
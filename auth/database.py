@@ -1,7 +1,8 @@
+import os
 import sqlite3
 
 def init_db():
-    conn = sqlite3.connect('users.db')
+    conn = sqlite3.connect(os.getenv('USERS_DB_PATH', 'users.db'))
     with open('init.db.sql') as f:
         conn.executescript(f.read())
     conn.commit()
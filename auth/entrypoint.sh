@@ -3,6 +3,9 @@
 # Initialize database
 python database.py
 
-# Start Flask application
-exec python main.py
+# Start Flask application: gunicorn workers in production, the development server otherwise
+if [ "${SERVER_MODE:-development}" = "production" ]; then
+    exec gunicorn -c gunicorn.conf.py main:app
+fi
 
+exec python main.py
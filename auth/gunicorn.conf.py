@@ -0,0 +1,61 @@
+"""Production server settings for the auth service.
+
+Start with ``gunicorn -c gunicorn.conf.py main:app``. Every setting can be
+overridden through the environment; send SIGHUP to the master for a graceful
+reload (new workers start before old ones finish their in-flight requests).
+"""
+import glob
+import multiprocessing
+import os
+
+from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+
+from action_metrics import TrackerFiles
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers after a number of requests to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+# Per-worker metric files are aggregated on /metrics; must be set before workers import the app
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+
+def on_starting(server):
+    """Start from an empty metrics directory so stale worker files don't leak into totals"""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+    TrackerFiles(directory).clear()
+
+
+def post_worker_init(worker):
+    # Threads and connections must be created in the worker, not in the master
+    import main
+    main.start_background_tasks()
+
+
+def worker_exit(server, worker):
+    import main
+    main.save_user_actions()
+    main.usage_buffer.stop()
+    if main.workload_capture is not None:
+        main.workload_capture.stop()
+    main.pg_pool.closeall()
+
+
+def child_exit(server, worker):
+    GunicornInternalPrometheusMetrics.mark_process_dead_on_child_exit(worker.pid)
+    # Keep the exited worker's user activity in the shared totals
+    TrackerFiles(os.environ['PROMETHEUS_MULTIPROC_DIR']).archive(worker.pid)
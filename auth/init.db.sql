@@ -1,9 +1,10 @@
+PRAGMA journal_mode=WAL;
+
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     email TEXT NOT NULL UNIQUE,
     password TEXT NOT NULL
 );
 
-INSERT INTO users (email, password) VALUES ('admin@example.com', 'admin');
-INSERT INTO users (email, password) VALUES ('user@example.com', 'user');
-
+INSERT INTO users (email, password) VALUES ('admin@example.com', 'admin') ON CONFLICT(email) DO NOTHING;
+INSERT INTO users (email, password) VALUES ('user@example.com', 'user') ON CONFLICT(email) DO NOTHING;
@@ -0,0 +1,267 @@
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+from prometheus_client import Counter as MetricCounter, Histogram
+from psycopg2 import extensions
+
+slow_query_logger = logging.getLogger('sql.slow')
+
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+request_phase_seconds = Histogram('request_phase_seconds', 'Time spent per request phase', ['endpoint', 'phase'],
+                                  buckets=PHASE_BUCKETS)
+sql_statement_seconds = Histogram('sql_statement_seconds', 'PostgreSQL statement execution time', ['statement'],
+                                  buckets=PHASE_BUCKETS)
+sql_slow_statements_total = MetricCounter('sql_slow_statements_total', 'Statements slower than the slow query threshold')
+
+# Statements slower than this are logged; negative disables the log
+slow_query_threshold = 0.2
+# Logged statements are cut to this many characters
+MAX_LOGGED_STATEMENT_LENGTH = 2000
+
+# Distinct statement labels per process; anything beyond is reported as 'other'
+MAX_STATEMENT_LABELS = 200
+MAX_STATEMENT_LENGTH = 200
+_statement_labels = set()
+_statement_labels_lock = threading.Lock()
+
+
+# ---------------- request phases ----------------
+def add_phase(name, seconds):
+    """Add ``seconds`` to phase ``name`` of the current request, if there is one"""
+    if not has_request_context():
+        return
+    phases = g.setdefault('phases', {})
+    phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - started)
+
+
+def init_app(app):
+    """Time every request and report its phases; the remainder is reported as 'handler'"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        if profiler.running:
+            profiler.enter()
+
+    @app.teardown_request
+    def observe_request_phases(exc):
+        if profiler.running:
+            profiler.leave()
+        started = g.pop('request_started', None)
+        phases = g.pop('phases', {})
+        if started is None or request.endpoint is None:
+            return
+        total = time.perf_counter() - started
+        for name, seconds in phases.items():
+            request_phase_seconds.labels(endpoint=request.endpoint, phase=name).observe(seconds)
+        request_phase_seconds.labels(endpoint=request.endpoint, phase='handler').observe(
+            max(0.0, total - sum(phases.values())))
+
+    app.json = timed_json_provider(type(app.json))(app)
+
+
+class TimedJSONMixin:
+    """Reports JSON encoding time of a Flask JSON provider as the 'serialize' phase"""
+
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def timed_json_provider(provider_class):
+    return type('Timed' + provider_class.__name__, (TimedJSONMixin, provider_class), {})
+
+
+# ---------------- SQL statements ----------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w$])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.IGNORECASE)
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+# One VALUES element: a placeholder (E'' strings included) or NULL/boolean, optionally cast, as
+# execute_values renders it: (?::text, NULL::date, ?::double precision)
+_VALUE = r"(?:E?\?|NULL|TRUE|FALSE)(?:::\w+(?: precision| varying)?(?:\[\])?)?"
+_TUPLE = rf'\(\s*{_VALUE}(?:\s*,\s*{_VALUE})*\s*\)'
+_VALUES_LIST = re.compile(rf'{_TUPLE}(?:\s*,\s*{_TUPLE})+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+# Column lists (projections vary per request) collapse to '...'
+_IDENTIFIER_LIST = re.compile(r'\b\w+(?:\.\w+)?(?:, \w+(?:\.\w+)?){2,}\b(?!\s*\()')
+
+
+@lru_cache(maxsize=1024)
+def _normalize(query):
+    text = _STRING.sub('?', query)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    # VALUES lists first: the identifier pass then only scans what is left of a large batch
+    text = _VALUES_LIST.sub('(...)', text)
+    return _IDENTIFIER_LIST.sub('...', text)
+
+
+def normalize_sql(query):
+    """Statement text with literals and parameters replaced by ``?``, usable as a metric label"""
+    if isinstance(query, bytes):
+        query = query.decode(errors='replace')
+    elif not isinstance(query, str):
+        # psycopg2.sql.Composable
+        query = str(query)
+    # Inlined VALUES lists (execute_values) make every batch a distinct string; keep them out of the cache
+    if len(query) > 4 * MAX_STATEMENT_LENGTH:
+        return _normalize.__wrapped__(query)
+    return _normalize(query)
+
+
+def _statement_label(statement):
+    statement = statement[:MAX_STATEMENT_LENGTH]
+    if statement in _statement_labels:
+        return statement
+    with _statement_labels_lock:
+        if len(_statement_labels) < MAX_STATEMENT_LABELS:
+            _statement_labels.add(statement)
+            return statement
+    return 'other'
+
+
+def _redact(params):
+    """Parameter names and types only; values never reach the log"""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items())
+    return ', '.join(type(value).__name__ for value in params)
+
+
+def observe_statement(query, params, seconds, rowcount=-1):
+    statement = normalize_sql(query)
+    sql_statement_seconds.labels(statement=_statement_label(statement)).observe(seconds)
+    add_phase('query', seconds)
+    if 0 <= slow_query_threshold <= seconds:
+        sql_slow_statements_total.inc()
+        slow_query_logger.warning(
+            'Slow query %.1fms endpoint=%s rows=%s: %s [%s]',
+            seconds * 1000, request.endpoint if has_request_context() else '-', rowcount,
+            statement[:MAX_LOGGED_STATEMENT_LENGTH], _redact(params)
+        )
+
+
+class TimedCursorMixin:
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            observe_statement(query, vars, time.perf_counter() - started, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            observe_statement(query, None, time.perf_counter() - started, self.rowcount)
+
+
+@lru_cache(maxsize=None)
+def timed_cursor_class(factory):
+    return type('Timed' + factory.__name__, (TimedCursorMixin, factory), {})
+
+
+class InstrumentedConnection(extensions.connection):
+    """psycopg2 connection whose cursors, of any cursor_factory, time every statement"""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or extensions.cursor
+        kwargs['cursor_factory'] = timed_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
+
+
+# ---------------- sampling profiler ----------------
+class SamplingProfiler:
+    """Samples the stacks of threads that are serving a request.
+
+    While running, a background thread wakes every ``interval`` seconds and
+    records the call stack of each request thread (registered by the
+    request hooks) in folded ``file:function;file:function`` form, so that
+    ``dump()`` output can be fed to flamegraph tools as is.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._active = set()
+        self._samples = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def enter(self):
+        self._active.add(threading.get_ident())
+
+    def leave(self):
+        self._active.discard(threading.get_ident())
+
+    def start(self, interval=None):
+        with self._lock:
+            if self._thread is not None:
+                return False
+            if interval:
+                self.interval = interval
+            self._samples.clear()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stopped.set()
+        thread.join()
+        self._active.clear()
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = [self._fold(frames[ident]) for ident in list(self._active) if ident in frames]
+            with self._lock:
+                self._samples.update(stacks)
+
+    def _fold(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f'{code.co_filename.rsplit("/", 1)[-1]}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def dump(self, limit=None):
+        """Folded stacks with sample counts, hottest first"""
+        with self._lock:
+            hottest = self._samples.most_common(limit)
+        return ''.join(f'{stack} {count}\n' for stack, count in hottest)
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,65 @@
+import logging
+import select
+import threading
+
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener(threading.Thread):
+    """Background thread delivering PostgreSQL LISTEN/NOTIFY payloads to callbacks.
+
+    ``handlers`` maps channel names to ``callback(payload)``. Notifications
+    sent while the listener is disconnected are lost, so ``on_reconnect`` is
+    called after every (re)connect to let callers resynchronise.
+    """
+
+    def __init__(self, connect, handlers, on_reconnect=None, poll_interval=5.0, max_backoff=30.0):
+        super().__init__(name='pg-notify-listener', daemon=True)
+        self._connect = connect
+        self._handlers = handlers
+        self._on_reconnect = on_reconnect
+        self._poll_interval = poll_interval
+        self._max_backoff = max_backoff
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    for channel in self._handlers:
+                        cursor.execute(f'LISTEN "{channel}"')
+                if self._on_reconnect:
+                    self._on_reconnect()
+                backoff = 1.0
+                self._listen(conn)
+            except Exception:
+                logger.exception('LISTEN connection failed, retrying in %.0fs', backoff)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _listen(self, conn):
+        while not self._stopped.is_set():
+            if select.select([conn], [], [], self._poll_interval) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                handler = self._handlers.get(notify.channel)
+                if handler is None:
+                    continue
+                try:
+                    handler(notify.payload)
+                except Exception:
+                    logger.exception('Handler for %s failed', notify.channel)
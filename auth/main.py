@@ -1,26 +1,141 @@
+import atexit
 import sqlite3
+import json
 import jwt
 import datetime
 import os
+import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from flask import Flask, request, jsonify, Blueprint
+from psycopg2.extras import RealDictCursor, execute_values
+from flask import Flask, Response, g, request, jsonify, Blueprint
 from functools import wraps
 from prometheus_flask_exporter import PrometheusMetrics
-from prometheus_client import Counter
+from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+from prometheus_client import Counter, Gauge, Histogram
+import bulk
+import capture
+import instrumentation
+from action_metrics import TrackerFiles, UserActionTracker
+from admission import ConcurrencyLimiter, Overloaded, RateLimiter, retry_after
+from instrumentation import InstrumentedConnection, phase, profiler
+from pool import PostgresPool, PoolTimeout
+from listener import NotificationListener
+from queries import (CHANGES_HORIZON_SQL, build_changes_queries, build_read_query, build_search_query,
+                     build_top_query, encode_change_cursor, encode_cursor, encode_search_cursor,
+                     filter_columns, parse_limit)
+from response_cache import ResponseCache
+from serialization import Compressor, FastJSONProvider
+from passwords import HasherBusy, PasswordHasher
+from token_cache import TokenCache
+from usage_buffer import BufferFull, UsageBuffer
+from user_store import PostgresUserStore, SQLiteUserStore
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
 
-# Initialize Prometheus metrics
-metrics = PrometheusMetrics(app)
+# Initialize Prometheus metrics; under a pre-fork server (gunicorn) every worker writes
+# to PROMETHEUS_MULTIPROC_DIR and /metrics aggregates all of them
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+if MULTIPROCESS:
+    metrics = GunicornInternalPrometheusMetrics(app)
+else:
+    metrics = PrometheusMetrics(app)
 
-# Custom metric for user actions
-user_actions_total = Counter('user_actions_total', 'Total user actions', ['action', 'user'])
+# orjson-backed JSON with ISO 8601 dates, and negotiated zstd/gzip compression of larger bodies
+app.json = FastJSONProvider(app)
+compressor = Compressor(
+    min_size=int(os.getenv('COMPRESS_MIN_SIZE', '1024')),
+    gzip_level=int(os.getenv('COMPRESS_GZIP_LEVEL', '3')),
+    zstd_level=int(os.getenv('COMPRESS_ZSTD_LEVEL', '3'))
+)
+if os.getenv('COMPRESS_RESPONSES', '1') == '1':
+    compressor.init_app(app)
+
+# Per-phase request timing (auth, connect, query, serialize, handler), SQL statement timing and slow query log
+instrumentation.init_app(app)
+instrumentation.slow_query_threshold = float(os.getenv('SLOW_QUERY_MS', '200')) / 1000
+if os.getenv('PROFILER_ENABLED', '0') == '1':
+    profiler.start(float(os.getenv('PROFILER_INTERVAL_MS', '5')) / 1000)
+
+# Gauges computed from in-process state, refreshed after each request in multiprocess mode
+process_gauges = []
+
+def process_gauge(name, documentation, value):
+    """Gauge reporting ``value()``, summed over live workers in multiprocess mode"""
+    gauge = Gauge(name, documentation, multiprocess_mode='livesum')
+    if MULTIPROCESS:
+        process_gauges.append((gauge, value))
+    else:
+        gauge.set_function(value)
+    return gauge
+
+# Top-user labels are re-exported at most once per interval
+TOP_USERS_EXPORT_INTERVAL = float(os.getenv('USER_METRICS_EXPORT_INTERVAL', '1'))
+last_top_users_export = 0.0
+
+@app.after_request
+def refresh_process_gauges(response):
+    global last_top_users_export
+    for gauge, value in process_gauges:
+        gauge.set(value())
+    now = time.monotonic()
+    if now - last_top_users_export >= TOP_USERS_EXPORT_INTERVAL:
+        last_top_users_export = now
+        export_top_users()
+    return response
+
+# Custom metric for user actions. Per-user detail lives in a bounded tracker instead of
+# a 'user' label, so the number of series doesn't grow with the number of users
+user_actions_total = Counter('user_actions_total', 'Total user actions', ['action'])
+# Ranked slots rather than a 'user' label: labels can't be removed in multiprocess mode, so
+# every user that ever entered the top would keep a series. Names are served by /stats/users
+# Every worker exports the merged view of all workers, so the freshest (largest) value wins
+user_actions_top = Gauge('user_actions_top_users', 'Estimated actions of the users at each top rank', ['rank'],
+                         multiprocess_mode='livemax')
+user_actions_other = Gauge('user_actions_top_other', 'Actions of users outside the top users',
+                           multiprocess_mode='livemax')
+USER_METRICS_TOP_K = int(os.getenv('USER_METRICS_TOP_K', '20'))
+user_action_tracker = UserActionTracker(
+    top_k=USER_METRICS_TOP_K,
+    width=int(os.getenv('USER_METRICS_SKETCH_WIDTH', '2048')),
+    depth=int(os.getenv('USER_METRICS_SKETCH_DEPTH', '4'))
+)
+
+# Workers share tracker states through the metrics directory; exited workers' states are archived there
+user_tracker_files = TrackerFiles(os.environ['PROMETHEUS_MULTIPROC_DIR']) if MULTIPROCESS else None
+saved_tracker_version = 0
+
+def save_user_actions():
+    """Publish this worker's tracker state for the other workers if it changed"""
+    global saved_tracker_version
+    version = user_action_tracker.version
+    if user_tracker_files is not None and version != saved_tracker_version:
+        user_tracker_files.save(user_action_tracker)
+        saved_tracker_version = version
+
+def all_user_actions(sketch=True):
+    """Tracker covering every worker (this one's live state plus the saved ones)"""
+    if user_tracker_files is None:
+        return user_action_tracker
+    return user_tracker_files.merged(user_action_tracker, sketch)
+
+def record_user_action(action, amount=1):
+    """Count an action of the current user"""
+    user_actions_total.labels(action=action).inc(amount)
+    user_action_tracker.record(request.current_user, action, amount)
+
+def export_top_users():
+    """Publish the top counts of all workers as rank slots 1..USER_METRICS_TOP_K (empty slots are 0)"""
+    save_user_actions()
+    snapshot = all_user_actions(sketch=False).snapshot(breakdown=False)
+    counts = [entry['count'] for entry in snapshot['users']]
+    for rank in range(USER_METRICS_TOP_K):
+        user_actions_top.labels(rank=str(rank + 1)).set(counts[rank] if rank < len(counts) else 0)
+    user_actions_other.set(snapshot['other'])
 
 def get_db_connection():
     """Get SQLite connection for user authentication"""
-    conn = sqlite3.connect('users.db')
+    conn = sqlite3.connect(os.getenv('USERS_DB_PATH', 'users.db'))
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -31,9 +146,183 @@ def get_postgres_connection():
         port=os.getenv('POSTGRES_PORT', '5432'),
         database=os.getenv('POSTGRES_DB', 'metrics_db'),
         user=os.getenv('POSTGRES_USER', 'metrics'),
-        password=os.getenv('POSTGRES_PASSWORD', 'metrics_pass')
+        password=os.getenv('POSTGRES_PASSWORD', 'metrics_pass'),
+        connection_factory=InstrumentedConnection
     )
 
+# Connection pool metrics
+pg_pool_wait_seconds = Histogram('pg_pool_wait_seconds', 'Time spent waiting for a pooled PostgreSQL connection',
+                                 buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+# Shared PostgreSQL connection pool for the actions blueprint
+pg_pool = PostgresPool(
+    get_postgres_connection,
+    minconn=int(os.getenv('PG_POOL_MIN', '1')),
+    maxconn=int(os.getenv('PG_POOL_MAX', '10')),
+    timeout=float(os.getenv('PG_POOL_TIMEOUT', '5')),
+    check_interval=float(os.getenv('PG_POOL_CHECK_INTERVAL', '30')),
+    max_idle=float(os.getenv('PG_POOL_MAX_IDLE', '300')),
+    on_wait=pg_pool_wait_seconds.observe,
+    on_checkout=lambda seconds: instrumentation.add_phase('connect', seconds)
+)
+
+pg_pool_connections_in_use = process_gauge('pg_pool_connections_in_use', 'PostgreSQL connections checked out of the pool',
+                                           lambda: pg_pool.in_use)
+pg_pool_connections_idle = process_gauge('pg_pool_connections_idle', 'Idle PostgreSQL connections held by the pool',
+                                         lambda: pg_pool.idle)
+
+# Read-through cache of /actions/read pages, kept coherent by write handlers and
+# by NOTIFY messages from the resources triggers (covers writes made outside the API)
+response_cache_requests_total = Counter('response_cache_requests_total', 'Resource read cache lookups', ['result'])
+response_cache = ResponseCache(
+    maxsize=int(os.getenv('READ_CACHE_SIZE', '1000')),
+    ttl=float(os.getenv('READ_CACHE_TTL', '30')),
+    on_hit=response_cache_requests_total.labels(result='hit').inc,
+    on_miss=response_cache_requests_total.labels(result='miss').inc
+)
+response_cache_entries = process_gauge('response_cache_entries', 'Pages held in the resource read cache',
+                                       lambda: len(response_cache))
+
+def on_resources_changed(payload):
+    """Invalidate cached reads from a resources_changed notification"""
+    change = json.loads(payload)
+    ids = change.get('ids')
+    if change['op'] == 'insert':
+        response_cache.invalidate_created()
+    elif ids is None:
+        response_cache.clear()
+    elif change['op'] == 'update':
+        response_cache.invalidate_updated(ids)
+    else:
+        response_cache.invalidate_deleted(ids)
+
+# Rows fetched per round trip when streaming /actions/read as NDJSON
+STREAM_CHUNK_SIZE = int(os.getenv('READ_STREAM_CHUNK_SIZE', '500'))
+
+def service_busy():
+    """Response returned when the connection or hashing pool is exhausted"""
+    response = jsonify({'message': 'Service is busy, try again later'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def too_many_requests(seconds):
+    """Response returned when a client exceeded its rate limit"""
+    response = jsonify({'message': 'Too many requests, slow down'})
+    response.headers['Retry-After'] = retry_after(seconds)
+    return response, 429
+
+# Admission control: per-IP and per-user token buckets, and a concurrency cap with a
+# bounded queue on database-bound endpoints. All limits apply per worker process
+admission_throttled_total = Counter('admission_throttled_total', 'Requests rejected by a rate limit', ['scope'])
+admission_shed_total = Counter('admission_shed_total', 'Requests shed by the database concurrency limit', ['reason'])
+admission_queue_wait_seconds = Histogram('admission_queue_wait_seconds', 'Time queued for a database request slot',
+                                         buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+ip_rate_limiter = RateLimiter(
+    rate=float(os.getenv('RATE_LIMIT_IP_RATE', '50')),
+    burst=float(os.getenv('RATE_LIMIT_IP_BURST', '100')),
+    max_keys=int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+)
+user_rate_limiter = RateLimiter(
+    rate=float(os.getenv('RATE_LIMIT_USER_RATE', '20')),
+    burst=float(os.getenv('RATE_LIMIT_USER_BURST', '40')),
+    max_keys=int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+)
+db_limit = int(os.getenv('DB_CONCURRENCY_LIMIT', os.getenv('PG_POOL_MAX', '10')))
+db_admission = ConcurrencyLimiter(
+    limit=db_limit,
+    max_queue=int(os.getenv('DB_QUEUE_SIZE', str(db_limit * 2))),
+    timeout=float(os.getenv('DB_QUEUE_TIMEOUT_MS', '500')) / 1000,
+    on_wait=admission_queue_wait_seconds.observe
+)
+admission_in_flight = process_gauge('admission_in_flight', 'Database-bound requests holding a slot',
+                                    lambda: db_admission.active)
+admission_queued = process_gauge('admission_queued', 'Database-bound requests waiting for a slot',
+                                 lambda: db_admission.waiting)
+# Scrapes must not be throttled
+RATE_LIMIT_EXEMPT_PATHS = {'/metrics'}
+
+@app.before_request
+def limit_ip_rate():
+    if request.path in RATE_LIMIT_EXEMPT_PATHS:
+        return None
+    wait = ip_rate_limiter.acquire(request.remote_addr)
+    if wait:
+        admission_throttled_total.labels(scope='ip').inc()
+        return too_many_requests(wait)
+    return None
+
+def limit_concurrency(f):
+    """Run the view in a database request slot, shedding load with 503 when overloaded.
+
+    A streamed response queries the database while it is sent, so it keeps the
+    slot until the response is closed.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            db_admission.acquire()
+        except Overloaded as e:
+            admission_shed_total.labels(reason=e.reason).inc()
+            return service_busy()
+        streamed = False
+        try:
+            response = f(*args, **kwargs)
+            if isinstance(response, Response) and response.is_streamed:
+                response.call_on_close(db_admission.release)
+                streamed = True
+            return response
+        finally:
+            if not streamed:
+                db_admission.release()
+    
+    return decorated
+
+# scrypt password hashing on a bounded worker pool
+password_hasher = PasswordHasher(
+    n=int(os.getenv('PASSWORD_SCRYPT_N', '16384')),
+    r=int(os.getenv('PASSWORD_SCRYPT_R', '8')),
+    p=int(os.getenv('PASSWORD_SCRYPT_P', '1')),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', '0')) or None,
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', '5')),
+    executor=os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')
+)
+
+# Credential storage: 'sqlite' (users.db) or 'postgres' (app_users through the pool)
+if os.getenv('USER_STORE', 'sqlite') == 'postgres':
+    user_store = PostgresUserStore(pg_pool, password_hasher)
+else:
+    user_store = SQLiteUserStore(get_db_connection, password_hasher)
+
+# Cache of verified tokens, so repeated requests skip signature verification
+jwt_cache_requests_total = Counter('jwt_cache_requests_total', 'JWT verification cache lookups', ['result'])
+token_cache = TokenCache(
+    maxsize=int(os.getenv('JWT_CACHE_SIZE', '10000')),
+    max_ttl=float(os.getenv('JWT_CACHE_TTL', '300')),
+    on_hit=jwt_cache_requests_total.labels(result='hit').inc,
+    on_miss=jwt_cache_requests_total.labels(result='miss').inc
+)
+jwt_cache_entries = process_gauge('jwt_cache_entries', 'Verified tokens held in the JWT cache',
+                                  lambda: len(token_cache))
+
+def load_revoked_tokens():
+    """Load revocations persisted by any worker, e.g. after this one (re)started listening"""
+    conn = pg_pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT token_key, extract(epoch FROM expires_at) FROM revoked_tokens
+                WHERE expires_at > now()
+            """)
+            for key, exp in cursor:
+                token_cache.revoke_key(bytes(key), exp)
+    finally:
+        pg_pool.putconn(conn)
+
+def on_token_revoked(payload):
+    """Apply a revocation broadcast by another worker process"""
+    revocation = json.loads(payload)
+    token_cache.revoke_key(bytes.fromhex(revocation['key']), revocation['exp'])
+
 def verify_token(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -45,13 +334,27 @@ def verify_token(f):
         if token.startswith('Bearer '):
             token = token[7:]
         
-        try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            request.current_user = data['email']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid!'}), 401
+        with phase('auth'):
+            data = token_cache.get(token)
+            if data is None:
+                if token_cache.is_revoked(token):
+                    return jsonify({'message': 'Token has been revoked!'}), 401
+                try:
+                    data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+                except jwt.ExpiredSignatureError:
+                    return jsonify({'message': 'Token has expired!'}), 401
+                except jwt.InvalidTokenError:
+                    return jsonify({'message': 'Token is invalid!'}), 401
+                token_cache.put(token, data)
+        
+        request.current_user = data['email']
+        request.token = token
+        request.token_claims = data
+        
+        wait = user_rate_limiter.acquire(request.current_user)
+        if wait:
+            admission_throttled_total.labels(scope='user').inc()
+            return too_many_requests(wait)
         
         return f(*args, **kwargs)
     
@@ -67,12 +370,12 @@ def login():
     email = data['email']
     password = data['password']
     
-    conn = get_db_connection()
-    user = conn.execute('SELECT * FROM users WHERE email = ? AND password = ?', 
-                       (email, password)).fetchone()
-    conn.close()
+    try:
+        authenticated = user_store.check_credentials(email, password)
+    except (PoolTimeout, HasherBusy):
+        return service_busy()
     
-    if user:
+    if authenticated:
         token = jwt.encode({
             'email': email,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
@@ -97,20 +400,13 @@ def register():
     password = data['password']
 
     try:
-        conn = get_db_connection()
-        # Check if user already exists
-        existing_user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-
-        if existing_user:
-            conn.close()
+        # Single atomic insert; a conflicting email means the user already exists
+        if not user_store.create_user(email, password):
             return jsonify({'message': 'User already exists'}), 409
 
-        # Insert new user
-        conn.execute('INSERT INTO users (email, password) VALUES (?, ?)', (email, password))
-        conn.commit()
-        conn.close()
-
         return jsonify({'message': 'User registered successfully'}), 201
+    except (PoolTimeout, HasherBusy):
+        return service_busy()
     except Exception as e:
         return jsonify({'message': 'Registration failed', 'error': str(e)}), 500
 
@@ -122,11 +418,85 @@ def verify():
         'email': request.current_user
     }), 200
 
+@app.route('/logout', methods=['POST'])
+@verify_token
+def logout():
+    """Revoke the presented token in every worker process"""
+    exp = request.token_claims.get('exp', 0)
+    key = TokenCache.key(request.token)
+    conn = None
+    try:
+        # Persist and broadcast first, so a failed logout leaves the token usable for a retry
+        conn = pg_pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM revoked_tokens WHERE expires_at < now()")
+            cursor.execute("""
+                INSERT INTO revoked_tokens (token_key, expires_at) VALUES (%s, to_timestamp(%s))
+                ON CONFLICT (token_key) DO NOTHING
+            """, (key, exp))
+            cursor.execute("SELECT pg_notify('token_revoked', %s)", (json.dumps({
+                'key': key.hex(),
+                'exp': exp
+            }),))
+        conn.commit()
+    except PoolTimeout:
+        return service_busy()
+    except Exception:
+        return jsonify({'message': 'Failed to revoke token'}), 500
+    finally:
+        if conn:
+            pg_pool.putconn(conn)
+
+    token_cache.revoke(request.token, exp)
+    return jsonify({'message': 'Token revoked'}), 200
+
+@app.route('/stats/users', methods=['GET'])
+@verify_token
+def top_users():
+    """Most active users with estimated per-action counts"""
+    try:
+        limit = parse_limit(request.args.get('limit'), default=USER_METRICS_TOP_K, maximum=USER_METRICS_TOP_K)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(all_user_actions().snapshot(limit)), 200
+
+@app.route('/stats/users/<path:email>', methods=['GET'])
+@verify_token
+def user_stats(email):
+    """Estimated per-action counts for one user"""
+    return jsonify({'user': email, 'actions': all_user_actions().user_actions(email)}), 200
+
+@app.route('/debug/profiler', methods=['GET', 'POST', 'DELETE'])
+@verify_token
+def sampling_profiler():
+    """Start (POST), stop (DELETE) or read (GET) this worker's sampling profiler"""
+    if os.getenv('PROFILER_ENDPOINT', '0') != '1':
+        return jsonify({'message': 'Not found'}), 404
+    if request.method == 'POST':
+        try:
+            interval = float(request.args.get('interval_ms', '5')) / 1000
+        except ValueError:
+            return jsonify({'message': 'interval_ms must be a number'}), 400
+        if not 0 < interval <= 1:
+            return jsonify({'message': 'interval_ms must be between 0 and 1000'}), 400
+        started = profiler.start(interval)
+        return jsonify({'message': 'Profiler started' if started else 'Profiler already running',
+                        'pid': os.getpid()}), 200
+    if request.method == 'DELETE':
+        profiler.stop()
+    try:
+        limit = parse_limit(request.args.get('limit'), default=None, maximum=None)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    # Folded stacks ("frame;frame;frame count"), ready for flamegraph tools
+    return Response(profiler.dump(limit), mimetype='text/plain', headers={'X-Profiler-Pid': str(os.getpid())})
+
 # Create actions blueprint for CRUD operations
 actions_bp = Blueprint('actions', __name__, url_prefix='/actions')
 
 @actions_bp.route('/create', methods=['POST'])
 @verify_token
+@limit_concurrency
 def create_resource():
     """Create a new resource in PostgreSQL"""
     data = request.get_json()
@@ -137,7 +507,7 @@ def create_resource():
     conn = None
     cursor = None
     try:
-        conn = get_postgres_connection()
+        conn = pg_pool.getconn()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         cursor.execute("""
@@ -158,52 +528,259 @@ def create_resource():
         
         resource_id = cursor.fetchone()['id']
         conn.commit()
+        response_cache.invalidate_created()
         
         # Increment custom metric
-        user_actions_total.labels(action='create', user=request.current_user).inc()
+        record_user_action('create')
         
         return jsonify({
             'message': 'Resource created successfully',
             'id': resource_id
         }), 201
+    except PoolTimeout:
+        return service_busy()
     except Exception:
         return jsonify({'message': 'Failed to create resource'}), 500
     finally:
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            pg_pool.putconn(conn)
 
 @actions_bp.route('/read', methods=['GET'])
 @verify_token
 def read_resources():
-    """Read all resources from PostgreSQL"""
+    """Read resources from PostgreSQL with keyset pagination and filters.
+
+    Cache hits and 304s are answered without a database request slot; only
+    a miss queues for one.
+    """
+    output = request.args.get('format', 'rows')
+    if output not in ('rows', 'columns', 'ndjson'):
+        return jsonify({'message': 'format must be one of: rows, columns, ndjson'}), 400
+    stream = output == 'ndjson'
+    try:
+        if stream:
+            # Streaming reads everything after the cursor unless a limit is given
+            limit = parse_limit(request.args.get('limit'), default=None, maximum=None)
+            query, params, _ = build_read_query(request.args, limit)
+            return stream_resources(query, params)
+
+        limit = parse_limit(request.args.get('limit'))
+        # Fetch one extra row to know whether another page exists
+        query, params, fields = build_read_query(request.args, limit + 1)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    columnar = output == 'columns'
+
+    cache_key = ResponseCache.make_key(request.path, request.args)
+    entry = response_cache.get(cache_key)
+    if entry is not None:
+        record_user_action('read')
+        return cached_response(entry.body, entry.etag)
+    # Taken before the query: a write invalidating the cache after it must not be undone by our put
+    generation = response_cache.generation
+    return read_page(query, params, fields, limit, columnar, cache_key, generation)
+
+@limit_concurrency
+def read_page(query, params, fields, limit, columnar, cache_key, generation):
+    """Query one /actions/read page and store it in the response cache"""
     conn = None
     cursor = None
     try:
-        conn = get_postgres_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        conn = pg_pool.getconn()
+        # Column-oriented output keeps the rows as tuples under a single header
+        cursor = conn.cursor() if columnar else conn.cursor(cursor_factory=RealDictCursor)
         
-        cursor.execute("SELECT * FROM resources ORDER BY created_at DESC")
+        cursor.execute(query, params)
         resources = cursor.fetchall()
+        if columnar:
+            id_index, created_index = fields.index('id'), fields.index('created_at')
+            ids = [row[id_index] for row in resources[:limit]]
+        else:
+            ids = [row['id'] for row in resources[:limit]]
+        next_cursor = None
+        if len(resources) > limit:
+            resources = resources[:limit]
+            last = resources[-1]
+            next_cursor = encode_cursor(
+                {'id': last[id_index], 'created_at': last[created_index]} if columnar else last)
         
         # Increment custom metric
-        user_actions_total.labels(action='read', user=request.current_user).inc()
+        record_user_action('read')
+        
+        body = {'message': 'Resources retrieved successfully'}
+        if columnar:
+            body['columns'] = fields
+            body['rows'] = resources
+        else:
+            body['data'] = resources
+        body['next_cursor'] = next_cursor
+        response = jsonify(body)
+        response.add_etag()
+        response_cache.put(cache_key, response.get_data(), response.get_etag()[0],
+                           ids=ids,
+                           filters=filter_columns(request.args),
+                           first_page=not request.args.get('cursor'),
+                           generation=generation)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except PoolTimeout:
+        return service_busy()
+    except Exception:
+        return jsonify({'message': 'Failed to read resources'}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            pg_pool.putconn(conn)
+
+@actions_bp.route('/changes', methods=['GET'])
+@verify_token
+@limit_concurrency
+def resource_changes():
+    """Resources created, updated or deleted after the ``since`` cursor, in commit-safe order"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        # Fetch one extra change to know whether another page exists
+        upserts_query, deletes_query, params, _ = build_changes_queries(request.args, limit + 1)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    conn = None
+    cursor = None
+    try:
+        conn = pg_pool.getconn()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cursor.execute(CHANGES_HORIZON_SQL)
+        state = cursor.fetchone()
+        if request.args.get('since') and int(params['since_xid']) < int(state['pruned']):
+            return jsonify({'message': 'Cursor is older than the tombstone retention, resync from /actions/read'}), 410
+        params['horizon'] = state['horizon']
+        
+        cursor.execute(upserts_query, params)
+        changes = [dict(row, op='upsert') for row in cursor.fetchall()]
+        cursor.execute(deletes_query, params)
+        changes += [dict(row, op='delete') for row in cursor.fetchall()]
+        changes.sort(key=lambda c: (int(c['change_xid']), c['id']))
+        
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if has_more:
+            next_cursor = encode_change_cursor(changes[-1]['change_xid'], changes[-1]['id'])
+        else:
+            # Everything below the horizon has been seen; resume from there
+            next_cursor = encode_change_cursor(state['horizon'], 0)
+        for change in changes:
+            del change['change_xid']
+        
+        record_user_action('changes')
         
         return jsonify({
-            'message': 'Resources retrieved successfully',
-            'data': resources
+            'message': 'Changes retrieved successfully',
+            'data': changes,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }), 200
+    except PoolTimeout:
+        return service_busy()
     except Exception:
-        return jsonify({'message': 'Failed to read resources'}), 500
+        return jsonify({'message': 'Failed to read changes'}), 500
     finally:
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            pg_pool.putconn(conn)
+
+@actions_bp.route('/search', methods=['GET'])
+@verify_token
+@limit_concurrency
+def search_resources():
+    """Full-text or fuzzy search over resources, ranked, with keyset pagination"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        # Fetch one extra row to know whether another page exists
+        query, params, _ = build_search_query(request.args, limit + 1)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    conn = None
+    cursor = None
+    try:
+        conn = pg_pool.getconn()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cursor.execute(query, params)
+        resources = cursor.fetchall()
+        next_cursor = None
+        if len(resources) > limit:
+            resources = resources[:limit]
+            next_cursor = encode_search_cursor(resources[-1])
+        
+        record_user_action('search')
+        
+        return jsonify({
+            'message': 'Search completed',
+            'data': resources,
+            'next_cursor': next_cursor
+        }), 200
+    except PoolTimeout:
+        return service_busy()
+    except Exception:
+        return jsonify({'message': 'Failed to search resources'}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            pg_pool.putconn(conn)
+
+def cached_response(body, etag):
+    """Serve a cached /actions/read page, answering 304 when the client's ETag matches"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@limit_concurrency
+def stream_resources(query, params):
+    """Stream query results as NDJSON through a server-side cursor"""
+    try:
+        conn = pg_pool.getconn()
+    except PoolTimeout:
+        return service_busy()
+
+    record_user_action('read')
+
+    def release():
+        # Runs from the generator and from the response's close(): a body that is
+        # never iterated (HEAD, client gone) must still give the connection back
+        nonlocal conn
+        if conn is not None:
+            pg_pool.putconn(conn)
+            conn = None
+
+    def generate():
+        try:
+            # Named cursor keeps the result set on the server; rows arrive in chunks
+            with conn.cursor(name='read_resources_stream', cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = STREAM_CHUNK_SIZE
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    yield b''.join(app.json.dumps(row, as_bytes=True) + b'\n' for row in rows)
+        finally:
+            release()
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(release)
+    return response
 
 @actions_bp.route('/update', methods=['POST'])
 @verify_token
+@limit_concurrency
 def update_resource():
     """Update a resource in PostgreSQL"""
     data = request.get_json()
@@ -214,7 +791,7 @@ def update_resource():
     conn = None
     cursor = None
     try:
-        conn = get_postgres_connection()
+        conn = pg_pool.getconn()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         # Build update query dynamically based on provided fields
@@ -236,24 +813,28 @@ def update_resource():
             return jsonify({'message': 'Resource not found'}), 404
         
         conn.commit()
+        response_cache.invalidate_updated([data['id']], params.keys() - {'id'})
         
         # Increment custom metric
-        user_actions_total.labels(action='update', user=request.current_user).inc()
+        record_user_action('update')
         
         return jsonify({
             'message': 'Resource updated successfully',
             'id': data['id']
         }), 200
+    except PoolTimeout:
+        return service_busy()
     except Exception:
         return jsonify({'message': 'Failed to update resource'}), 500
     finally:
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            pg_pool.putconn(conn)
 
 @actions_bp.route('/delete', methods=['DELETE'])
 @verify_token
+@limit_concurrency
 def delete_resource():
     """Delete a resource from PostgreSQL"""
     data = request.get_json()
@@ -264,7 +845,7 @@ def delete_resource():
     conn = None
     cursor = None
     try:
-        conn = get_postgres_connection()
+        conn = pg_pool.getconn()
         cursor = conn.cursor()
         
         cursor.execute("DELETE FROM resources WHERE id = %s", (data['id'],))
@@ -273,24 +854,275 @@ def delete_resource():
             return jsonify({'message': 'Resource not found'}), 404
         
         conn.commit()
+        response_cache.invalidate_deleted([data['id']])
         
         # Increment custom metric
-        user_actions_total.labels(action='delete', user=request.current_user).inc()
+        record_user_action('delete')
         
         return jsonify({
             'message': 'Resource deleted successfully',
             'id': data['id']
         }), 200
+    except PoolTimeout:
+        return service_busy()
     except Exception:
         return jsonify({'message': 'Failed to delete resource'}), 500
     finally:
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            pg_pool.putconn(conn)
+
+@actions_bp.route('/stats/top', methods=['GET'])
+@verify_token
+@limit_concurrency
+def top_usage():
+    """Top-N resources, users, kinds or purposes by usage, served from the rollup tables"""
+    try:
+        query, params = build_top_query(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    conn = None
+    cursor = None
+    try:
+        conn = pg_pool.getconn()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cursor.execute(query, params)
+        
+        return jsonify({
+            'by': request.args.get('by', 'resources'),
+            'data': cursor.fetchall()
+        }), 200
+    except PoolTimeout:
+        return service_busy()
+    except Exception:
+        return jsonify({'message': 'Failed to read usage statistics'}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            pg_pool.putconn(conn)
+
+def flush_usage(items):
+    """Write coalesced (resource_id, email, hits, last_access) rows to usage_stats in one transaction"""
+    conn = pg_pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            # Users authenticate by email; make sure each has an app_users row to reference
+            execute_values(cursor, """
+                INSERT INTO app_users (full_name, email)
+                SELECT split_part(v.email, '@', 1), v.email FROM (VALUES %s) AS v (email)
+                ON CONFLICT (email) DO NOTHING
+            """, [(email,) for email in {item[1] for item in items}])
+            execute_values(cursor, """
+                INSERT INTO usage_stats (resource_id, user_id, usage_count, last_access)
+                SELECT v.resource_id, u.id, v.hits, to_timestamp(v.last_access)
+                FROM (VALUES %s) AS v (resource_id, email, hits, last_access)
+                JOIN app_users u ON u.email = v.email
+                JOIN resources r ON r.id = v.resource_id
+                ON CONFLICT (resource_id, user_id)
+                DO UPDATE SET usage_count = usage_stats.usage_count + excluded.usage_count,
+                              last_access = greatest(usage_stats.last_access, excluded.last_access)
+            """, items, template='(%s::bigint, %s, %s::integer, %s::double precision)', page_size=len(items))
+        conn.commit()
+    finally:
+        pg_pool.putconn(conn)
+
+usage_flush_seconds = Histogram('usage_flush_seconds', 'Time to write a batch of buffered usage to PostgreSQL')
+usage_flushed_total = Counter('usage_flushed_entries_total', 'Coalesced usage entries written to PostgreSQL')
+usage_rejected_total = Counter('usage_rejected_total', 'Usage records rejected because the buffer was full')
+usage_dropped_total = Counter('usage_dropped_entries_total', 'Buffered usage entries the database rejected as invalid')
+
+def observe_usage_flush(seconds, entries):
+    usage_flush_seconds.observe(seconds)
+    usage_flushed_total.inc(entries)
+
+usage_buffer = UsageBuffer(
+    flush_usage,
+    max_entries=int(os.getenv('USAGE_BUFFER_MAX_ENTRIES', '10000')),
+    flush_size=int(os.getenv('USAGE_FLUSH_SIZE', '1000')),
+    interval=float(os.getenv('USAGE_FLUSH_INTERVAL_MS', '500')) / 1000,
+    timeout=float(os.getenv('USAGE_BUFFER_TIMEOUT', '1')),
+    on_flush=observe_usage_flush,
+    # Bad data fails the same way on every retry; anything else (connection loss, pool timeout) is retried
+    permanent_errors=(psycopg2.DataError, psycopg2.IntegrityError),
+    on_drop=usage_dropped_total.inc
+)
+usage_buffer_entries = process_gauge('usage_buffer_entries', 'Coalesced usage entries waiting to be flushed',
+                                     lambda: len(usage_buffer))
+
+@actions_bp.route('/use', methods=['POST'])
+@verify_token
+def use_resource():
+    """Record an access to a resource; written to usage_stats in the background"""
+    data = request.get_json(silent=True)
+    
+    resource_id = data.get('id') if isinstance(data, dict) else None
+    if not isinstance(resource_id, int) or isinstance(resource_id, bool) or not 1 <= resource_id <= bulk.MAX_ID:
+        return jsonify({'message': 'Missing required field: id'}), 400
+    
+    try:
+        usage_buffer.record(resource_id, request.current_user)
+    except BufferFull:
+        usage_rejected_total.inc()
+        return service_busy()
+    
+    record_user_action('use')
+    
+    return jsonify({
+        'message': 'Usage recorded',
+        'id': resource_id
+    }), 202
+
+# Bulk endpoints: maximum items per request and default failure semantics
+# ('atomic' rejects the whole batch on any invalid item, 'partial' applies the valid ones)
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '1000'))
+BULK_DEFAULT_MODE = os.getenv('BULK_DEFAULT_MODE', 'atomic')
+
+BULK_STATUSES = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}
+
+def apply_bulk(action, validate, apply):
+    """Validate a bulk payload and apply it to PostgreSQL in a single transaction"""
+    try:
+        items = bulk.parse_items(request, BULK_MAX_ITEMS)
+        mode = bulk.parse_mode(request.args.get('mode'), BULK_DEFAULT_MODE)
+    except bulk.BulkError as e:
+        return jsonify({'message': e.message}), e.status
+
+    valid, errors = validate(items)
+    results = [{'status': 'error', 'error': errors[i]} if i in errors else {'status': 'skipped'}
+               for i in range(len(items))]
+
+    if not valid or (errors and mode == 'atomic'):
+        return jsonify({
+            'message': f'Bulk {action} rejected',
+            'results': results
+        }), 400
+
+    conn = None
+    cursor = None
+    try:
+        conn = pg_pool.getconn()
+        cursor = conn.cursor()
+
+        applied = 0
+        for (index, item), resource_id in zip(valid, apply(cursor, valid)):
+            if resource_id is None:
+                results[index] = {'status': 'not_found', 'id': item['id']}
+            else:
+                results[index] = {'status': BULK_STATUSES[action], 'id': resource_id}
+                applied += 1
+
+        if applied < len(valid) and mode == 'atomic':
+            conn.rollback()
+            return jsonify({
+                'message': f'Bulk {action} rejected',
+                'results': results
+            }), 404
+
+        conn.commit()
+        invalidate_bulk(action, [item for _, item in valid])
+
+        # Increment custom metric
+        record_user_action(action, applied)
+
+        return jsonify({
+            'message': f'Bulk {action} completed',
+            'applied': applied,
+            'failed': len(items) - applied,
+            'results': results
+        }), 201 if action == 'create' else 200
+    except PoolTimeout:
+        return service_busy()
+    except Exception:
+        return jsonify({'message': f'Failed to {action} resources'}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            pg_pool.putconn(conn)
+
+def invalidate_bulk(action, items):
+    """Drop cached reads affected by a committed bulk operation"""
+    if action == 'create':
+        response_cache.invalidate_created()
+    elif action == 'update':
+        columns = {column for item in items for column in item if column != 'id'}
+        response_cache.invalidate_updated([item['id'] for item in items], columns)
+    else:
+        response_cache.invalidate_deleted([item['id'] for item in items])
+
+@actions_bp.route('/bulk/create', methods=['POST'])
+@verify_token
+@limit_concurrency
+def bulk_create_resources():
+    """Create many resources with a single multi-row INSERT"""
+    return apply_bulk('create', bulk.validate_create, bulk.insert_many)
+
+@actions_bp.route('/bulk/update', methods=['POST'])
+@verify_token
+@limit_concurrency
+def bulk_update_resources():
+    """Update many resources with UPDATE ... FROM (VALUES ...)"""
+    return apply_bulk('update', bulk.validate_update, bulk.update_many)
+
+@actions_bp.route('/bulk/delete', methods=['DELETE', 'POST'])
+@verify_token
+@limit_concurrency
+def bulk_delete_resources():
+    """Delete many resources with DELETE ... WHERE id = ANY(...)"""
+    return apply_bulk('delete', bulk.validate_delete, bulk.delete_many)
+
+# Workload capture: every /actions/* call appended to CAPTURE_PATH for replay by the generator
+capture_records_total = Counter('capture_records_total', 'Workload capture records', ['result'])
+workload_capture = None
+if os.getenv('CAPTURE_PATH'):
+    workload_capture = capture.WorkloadCapture(
+        os.getenv('CAPTURE_PATH'),
+        max_bytes=int(os.getenv('CAPTURE_MAX_MB', '1024')) * 1024 * 1024,
+        interval=float(os.getenv('CAPTURE_FLUSH_INTERVAL_MS', '1000')) / 1000,
+        on_record=lambda result: capture_records_total.labels(result=result).inc()
+    )
+
+    @actions_bp.after_request
+    def capture_action(response):
+        started = g.get('request_started')
+        if started is not None:
+            workload_capture.record(capture.describe(
+                request, response, getattr(request, 'current_user', None), time.perf_counter() - started))
+        return response
 
 # Register the actions blueprint
 app.register_blueprint(actions_bp)
 
+# Cache invalidation over LISTEN can be turned off; token revocations always need it, or a
+# logout would only reach the worker that served it
+READ_CACHE_LISTEN = os.getenv('READ_CACHE_LISTEN', '1') == '1'
+
+def resync_after_reconnect():
+    """Notifications are lost while disconnected: drop cached reads and reload revocations"""
+    if READ_CACHE_LISTEN:
+        response_cache.clear()
+    load_revoked_tokens()
+
+# Receives cache invalidations and token revocations from PostgreSQL and other workers
+listen_handlers = {'token_revoked': on_token_revoked}
+if READ_CACHE_LISTEN:
+    listen_handlers['resources_changed'] = on_resources_changed
+pg_listener = NotificationListener(get_postgres_connection, listen_handlers, on_reconnect=resync_after_reconnect)
+
+def start_background_tasks():
+    """Open the pool's minimum connections and start per-process background threads"""
+    pg_pool.open()
+    pg_listener.start()
+    usage_buffer.start()
+    atexit.register(usage_buffer.stop)
+    if workload_capture is not None:
+        workload_capture.start()
+        atexit.register(workload_capture.stop)
+
 if __name__ == '__main__':
+    start_background_tasks()
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,83 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+SCHEME = 'scrypt'
+KEY_LENGTH = 32
+
+
+class HasherBusy(Exception):
+    """Raised when the KDF worker pool has no free slot in time"""
+
+
+def _scrypt(password, salt, n, r, p):
+    # Module level so it can run in a process pool
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=KEY_LENGTH)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """scrypt password hashing executed on a bounded worker pool.
+
+    Request threads wait on the pool instead of running the KDF themselves, so
+    at most ``workers`` hashes run at once and at most ``max_pending`` wait in
+    line; beyond that ``HasherBusy`` is raised after ``timeout`` seconds.
+    Hashes are stored as ``scrypt$n$r$p$salt$hash``. Stored values without
+    the prefix are legacy plaintext passwords and always need a rehash.
+    """
+
+    def __init__(self, n=2 ** 14, r=8, p=1, workers=None, max_pending=None,
+                 timeout=5.0, executor='thread'):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.timeout = timeout
+        workers = workers or os.cpu_count() or 1
+        pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        self._executor = pool_class(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 4)
+
+    def _run(self, password, salt, n, r, p):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy('Password hashing pool is saturated')
+        try:
+            future = self._executor.submit(_scrypt, password.encode(), salt, n, r, p)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        digest = self._run(password, salt, self.n, self.r, self.p)
+        return f'{SCHEME}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(digest)}'
+
+    def verify(self, password, stored):
+        """Return ``(matches, needs_rehash)`` for a stored password value"""
+        if not stored.startswith(SCHEME + '$'):
+            matches = hmac.compare_digest(stored.encode(), password.encode())
+            return matches, matches
+        try:
+            _, n, r, p, salt, expected = stored.split('$')
+            n, r, p = int(n), int(r), int(p)
+            salt, expected = _unb64(salt), _unb64(expected)
+        except ValueError:
+            return False, False
+        digest = self._run(password, salt, n, r, p)
+        matches = hmac.compare_digest(digest, expected)
+        return matches, matches and (n, r, p) != (self.n, self.r, self.p)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
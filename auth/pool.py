@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no PostgreSQL connection became available in time"""
+
+
+class PostgresPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily up to ``maxconn``. Up to ``minconn`` idle
+    connections are kept open indefinitely; extra idle connections are closed
+    after ``max_idle`` seconds. A connection that sat idle longer than
+    ``check_interval`` seconds is pinged before being handed out, and broken
+    connections are transparently replaced.
+
+    ``on_wait(seconds)`` receives the time spent waiting for a free slot and
+    ``on_checkout(seconds)`` the whole checkout, including health checks and
+    opening new connections.
+    """
+
+    def __init__(self, connect, minconn=1, maxconn=10, timeout=5.0,
+                 check_interval=30.0, max_idle=300.0, on_wait=None, on_checkout=None):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError('Invalid pool size: minconn=%s maxconn=%s' % (minconn, maxconn))
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_idle = max_idle
+        self._on_wait = on_wait
+        self._on_checkout = on_checkout
+        self._cond = threading.Condition()
+        # Idle connections as (conn, returned_at); newest at the end (LIFO)
+        self._idle = []
+        self._opened = 0
+        self._in_use = 0
+        self._closed = False
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    @property
+    def size(self):
+        return self._opened
+
+    def open(self):
+        """Pre-open ``minconn`` connections; failures are left for checkout to retry"""
+        opened = []
+        try:
+            for _ in range(self.minconn - self._opened):
+                opened.append(self._connect())
+        except Exception:
+            logger.warning('Pre-opened %d of %d PostgreSQL connections', len(opened), self.minconn, exc_info=True)
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                for conn in opened:
+                    self._opened += 1
+                    self._idle.append((conn, now))
+                self._cond.notify_all()
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, waiting up to ``timeout`` seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        stale = []
+        conn = None
+        idle_since = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout('Connection pool is closed')
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._opened < self.maxconn:
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._observe_wait(time.monotonic() - started)
+                    raise PoolTimeout('No database connection available within %.1fs' % timeout)
+                self._cond.wait(remaining)
+            self._in_use += 1
+            stale = self._collect_stale()
+
+        self._observe_wait(time.monotonic() - started)
+        for old in stale:
+            _close_quietly(old)
+
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_since):
+                _close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        if self._on_checkout:
+            self._on_checkout(time.monotonic() - started)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if not close and not conn.closed:
+            try:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+
+        with self._cond:
+            self._in_use -= 1
+            if close or conn.closed or self._closed:
+                self._opened -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            _close_quietly(conn)
+
+    def closeall(self):
+        """Close idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _collect_stale(self):
+        """Detach idle connections beyond ``minconn`` that outlived ``max_idle``"""
+        stale = []
+        cutoff = time.monotonic() - self.max_idle
+        # Oldest idle connections sit at the front of the list
+        while len(self._idle) > self.minconn and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.pop(0)
+            self._opened -= 1
+            stale.append(conn)
+        return stale
+
+    def _observe_wait(self, seconds):
+        if self._on_wait is not None:
+            self._on_wait(seconds)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
@@ -0,0 +1,286 @@
+import base64
+import datetime
+import json
+
+# Columns of the resources table that clients may project or filter on
+RESOURCE_COLUMNS = (
+    'id', 'name', 'author', 'annotation', 'kind', 'purpose', 'open_date',
+    'expiry_date', 'usage_conditions', 'url', 'created_at', 'updated_at'
+)
+
+# Exact-match filters; a comma separated value matches any of the listed values
+FILTER_FIELDS = ('kind', 'purpose', 'usage_conditions')
+
+# Range filters: query parameter -> (column, operator, parser)
+RANGE_FILTERS = {
+    'created_from': ('created_at', '>=', datetime.datetime.fromisoformat),
+    'created_to': ('created_at', '<', datetime.datetime.fromisoformat),
+    'open_from': ('open_date', '>=', datetime.date.fromisoformat),
+    'open_to': ('open_date', '<=', datetime.date.fromisoformat),
+    'expiry_from': ('expiry_date', '>=', datetime.date.fromisoformat),
+    'expiry_to': ('expiry_date', '<=', datetime.date.fromisoformat),
+}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just after ``row``"""
+    created_at = row['created_at']
+    if isinstance(created_at, datetime.datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, resource_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(created_at), int(resource_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_fields(value):
+    """Validate a comma separated column projection; id and created_at are always included"""
+    if not value:
+        return list(RESOURCE_COLUMNS)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in RESOURCE_COLUMNS]
+    if unknown:
+        raise ValueError('Unknown fields: ' + ', '.join(unknown))
+    for required in ('created_at', 'id'):
+        if required not in fields:
+            fields.insert(0, required)
+    return fields
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    if maximum is not None:
+        limit = min(limit, maximum)
+    return limit
+
+
+def filter_conditions(args, params):
+    """WHERE conditions for the exact and range filters in ``args``; fills ``params``"""
+    conditions = []
+    for field in FILTER_FIELDS:
+        value = args.get(field)
+        if value:
+            conditions.append(f"{field} = ANY(%({field})s)")
+            params[field] = [v for v in value.split(',') if v]
+
+    for arg, (column, operator, parser) in RANGE_FILTERS.items():
+        value = args.get(arg)
+        if value:
+            try:
+                params[arg] = parser(value)
+            except ValueError:
+                raise ValueError(f'Invalid date for {arg}: {value}')
+            conditions.append(f"{column} {operator} %({arg})s")
+    return conditions
+
+
+def build_read_query(args, limit):
+    """Build the keyset-paginated SELECT for /actions/read from request args.
+
+    Returns ``(query, params, fields)``. ``limit`` may be None to read
+    everything after the cursor (used by the streaming mode).
+    """
+    fields = parse_fields(args.get('fields'))
+    params = {}
+    conditions = filter_conditions(args, params)
+
+    cursor = args.get('cursor')
+    if cursor:
+        params['cursor_created_at'], params['cursor_id'] = decode_cursor(cursor)
+        conditions.append("(created_at, id) < (%(cursor_created_at)s, %(cursor_id)s)")
+
+    query = f"SELECT {', '.join(fields)} FROM resources"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        query += " LIMIT %(limit)s"
+        params['limit'] = limit
+    return query, params, fields
+
+
+def filter_columns(args):
+    """Columns the /actions/read query in ``args`` filters on"""
+    columns = {field for field in FILTER_FIELDS if args.get(field)}
+    columns.update(column for arg, (column, _, _) in RANGE_FILTERS.items() if args.get(arg))
+    return columns
+
+
+# /actions/search modes -> (rank expression, match condition)
+SEARCH_MODES = {
+    # Words and phrases in name/annotation via the search_vector GIN index
+    'text': (
+        "ts_rank_cd(search_vector, websearch_to_tsquery('english', %(q)s))",
+        "search_vector @@ websearch_to_tsquery('english', %(q)s)",
+    ),
+    # Typos and prefixes in name/author via the trigram indexes
+    'fuzzy': (
+        "greatest(similarity(name, %(q)s), similarity(coalesce(author, ''), %(q)s))",
+        "(name %% %(q)s OR author %% %(q)s OR name ILIKE %(prefix)s OR author ILIKE %(prefix)s)",
+    ),
+}
+
+MAX_SEARCH_LENGTH = 200
+
+
+def encode_search_cursor(row):
+    """Opaque keyset cursor pointing just after ``row`` in rank order"""
+    raw = json.dumps([row['rank'], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_search_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, resource_id = json.loads(raw)
+        return float(rank), int(resource_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def build_search_query(args, limit):
+    """Build the ranked, keyset-paginated search over resources from request args.
+
+    Returns ``(query, params, fields)``; rows carry a ``rank`` column and are
+    ordered by ``(rank, id)`` descending. Accepts the /actions/read filters.
+    """
+    q = (args.get('q') or '').strip()
+    if not q:
+        raise ValueError('Missing required parameter: q')
+    if len(q) > MAX_SEARCH_LENGTH:
+        raise ValueError(f'q must be at most {MAX_SEARCH_LENGTH} characters')
+    mode = args.get('mode', 'text')
+    if mode not in SEARCH_MODES:
+        raise ValueError('mode must be one of: ' + ', '.join(SEARCH_MODES))
+
+    fields = parse_fields(args.get('fields'))
+    rank, match = SEARCH_MODES[mode]
+    params = {'q': q, 'prefix': _escape_like(q) + '%', 'limit': limit}
+    conditions = [match] + filter_conditions(args, params)
+
+    outer = ''
+    cursor = args.get('cursor')
+    if cursor:
+        params['cursor_rank'], params['cursor_id'] = decode_search_cursor(cursor)
+        # rank is a real; compare as real so the cursor row itself is excluded exactly
+        outer = " WHERE (rank, id) < (%(cursor_rank)s::real, %(cursor_id)s)"
+
+    columns = ', '.join(fields)
+    query = (f"SELECT {columns}, rank FROM ("
+             f"SELECT {columns}, {rank} AS rank FROM resources WHERE {' AND '.join(conditions)}"
+             f") matches{outer} ORDER BY rank DESC, id DESC LIMIT %(limit)s")
+    return query, params, fields + ['rank']
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# /actions/changes: everything below the snapshot xmin is committed and can no longer change order
+CHANGES_HORIZON_SQL = """
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS horizon,
+           (SELECT pruned_xid::text FROM change_feed_horizon) AS pruned
+"""
+
+
+def encode_change_cursor(change_xid, resource_id):
+    """Opaque /actions/changes cursor pointing just after ``(change_xid, resource_id)``"""
+    raw = json.dumps([str(change_xid), resource_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_change_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        change_xid, resource_id = json.loads(raw)
+        return int(change_xid), int(resource_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def build_changes_queries(args, limit):
+    """Build the two /actions/changes queries from request args.
+
+    Returns ``(upserts_query, deletes_query, params, fields)``. Both read
+    rows after the ``since`` cursor in ``(change_xid, id)`` order and below
+    ``%(horizon)s``, which the caller adds to ``params`` from
+    ``CHANGES_HORIZON_SQL``.
+    """
+    fields = parse_fields(args.get('fields'))
+    since = args.get('since')
+    change_xid, resource_id = decode_change_cursor(since) if since else (0, 0)
+    params = {'since_xid': str(change_xid), 'since_id': resource_id, 'limit': limit}
+    upserts = (f"SELECT change_xid::text AS change_xid, {', '.join(fields)} FROM resources"
+               " WHERE (change_xid, id) > (%(since_xid)s::xid8, %(since_id)s)"
+               " AND change_xid < %(horizon)s::xid8"
+               " ORDER BY change_xid, id LIMIT %(limit)s")
+    deletes = ("SELECT change_xid::text AS change_xid, resource_id AS id FROM resource_tombstones"
+               " WHERE (change_xid, resource_id) > (%(since_xid)s::xid8, %(since_id)s)"
+               " AND change_xid < %(horizon)s::xid8"
+               " ORDER BY change_xid, resource_id LIMIT %(limit)s")
+    return upserts, deletes, params, fields
+
+
+# /actions/stats/top dimensions; each reads a precomputed usage rollup table
+TOP_QUERIES = {
+    'resources': """
+        SELECT r.resource_id AS id, res.name, r.kind, r.purpose, r.usage_count, r.users, r.last_access
+        FROM usage_rollup_resource r JOIN resources res ON res.id = r.resource_id
+        ORDER BY r.usage_count DESC, r.resource_id
+        LIMIT %(limit)s
+    """,
+    'users': """
+        SELECT r.user_id AS id, u.email, u.full_name, r.usage_count, r.resources, r.last_access
+        FROM usage_rollup_user r JOIN app_users u ON u.id = r.user_id
+        ORDER BY r.usage_count DESC, r.user_id
+        LIMIT %(limit)s
+    """,
+    'kinds': """
+        SELECT kind, sum(usage_count)::bigint AS usage_count FROM usage_rollup_kind
+        GROUP BY kind ORDER BY usage_count DESC, kind
+        LIMIT %(limit)s
+    """,
+    'purposes': """
+        SELECT purpose, sum(usage_count)::bigint AS usage_count FROM usage_rollup_kind
+        GROUP BY purpose ORDER BY usage_count DESC, purpose
+        LIMIT %(limit)s
+    """,
+    'kind_purpose': """
+        SELECT kind, purpose, usage_count FROM usage_rollup_kind
+        ORDER BY usage_count DESC, kind, purpose
+        LIMIT %(limit)s
+    """,
+    # Most recent days rather than busiest: a usage timeline
+    'days': """
+        SELECT day, usage_count FROM usage_rollup_daily
+        ORDER BY day DESC
+        LIMIT %(limit)s
+    """,
+}
+
+
+def build_top_query(args):
+    """``(query, params)`` for /actions/stats/top; raises ValueError on a bad dimension or limit"""
+    by = args.get('by', 'resources')
+    if by not in TOP_QUERIES:
+        raise ValueError('by must be one of: ' + ', '.join(TOP_QUERIES))
+    limit = parse_limit(args.get('limit'), default=10, maximum=MAX_LIMIT)
+    return TOP_QUERIES[by], {'limit': limit}
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'ids', 'filters', 'first_page', 'expires_at')
+
+    def __init__(self, body, etag, ids, filters, first_page, expires_at):
+        self.body = body
+        self.etag = etag
+        self.ids = ids
+        self.filters = filters
+        self.first_page = first_page
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """TTL + LRU cache of serialized /actions/read pages with targeted invalidation.
+
+    Every entry remembers the resource ids it contains, the columns its query
+    filters on and whether it is a first page (no cursor). Because pages are
+    keyset-paginated on ``(created_at, id)``, a new resource can only appear
+    on first pages, so writes invalidate just the entries they can affect:
+
+    * create: first pages
+    * update: pages containing the id, plus pages filtering on a changed column
+    * delete: pages containing the id
+
+    Every invalidation bumps ``generation``. A reader takes it before running
+    its query and passes it to ``put``, which skips the page if anything was
+    invalidated meanwhile: the page may predate that write.
+    """
+
+    def __init__(self, maxsize=1000, ttl=30.0, on_hit=None, on_miss=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._on_hit = on_hit
+        self._on_miss = on_miss
+        self._entries = OrderedDict()
+        self._by_id = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @staticmethod
+    def make_key(path, args):
+        """Canonical key: path plus sorted query parameters"""
+        return path + '?' + '&'.join(f'{k}={v}' for k, v in sorted(args.items(multi=True)))
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.expires_at:
+                    self._entries.move_to_end(key)
+                    if self._on_hit:
+                        self._on_hit()
+                    return entry
+                self._drop(key)
+        if self._on_miss:
+            self._on_miss()
+        return None
+
+    def put(self, key, body, etag, ids, filters, first_page, generation=None):
+        if self.maxsize <= 0:
+            return
+        entry = CacheEntry(body, etag, frozenset(ids), frozenset(filters), first_page,
+                           time.monotonic() + self.ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            for resource_id in entry.ids:
+                self._by_id.setdefault(resource_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_created(self):
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, e in self._entries.items() if e.first_page]:
+                self._drop(key)
+
+    def invalidate_updated(self, ids, columns=None):
+        """Invalidate pages containing ``ids``; ``columns=None`` means any column may have changed"""
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for resource_id in ids:
+                keys.update(self._by_id.get(resource_id, ()))
+            for key, entry in self._entries.items():
+                if entry.filters and (columns is None or entry.filters & set(columns)):
+                    keys.add(key)
+            for key in keys:
+                self._drop(key)
+
+    def invalidate_deleted(self, ids):
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for resource_id in ids:
+                keys.update(self._by_id.get(resource_id, ()))
+            for key in keys:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_id.clear()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for resource_id in entry.ids:
+            keys = self._by_id.get(resource_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_id[resource_id]
@@ -0,0 +1,137 @@
+import datetime
+import decimal
+import gzip
+import json
+import zlib
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+# Response bodies of these types are worth compressing
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain', 'text/html', 'text/csv'}
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider encoding with orjson when available.
+
+    Dates and datetimes are written as ISO 8601 (Flask's default provider
+    uses RFC 822 HTTP dates) and tuples as arrays, so rows from a plain
+    cursor serialize without building a dict per row. ``dumps(obj,
+    as_bytes=True)`` skips the str round trip for response bodies.
+    """
+
+    def dumps(self, obj, as_bytes=False, **kwargs):
+        if orjson is not None and not kwargs:
+            data = orjson.dumps(obj, default=_default)
+            return data if as_bytes else data.decode()
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('separators', (',', ':'))
+        text = json.dumps(obj, **kwargs)
+        return text.encode() if as_bytes else text
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj, as_bytes=True) + b'\n', mimetype=self.mimetype)
+
+
+# ---------------- compression ----------------
+def available_encodings():
+    """Content codings the service can produce, most preferred first"""
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+class Compressor:
+    """Negotiated gzip/zstd compression of responses above ``min_size`` bytes.
+
+    Streamed responses are compressed chunk by chunk with a flush after each
+    chunk, so NDJSON rows still reach the client as they are produced.
+    A strong ETag becomes weak on a compressed body, which keeps
+    ``If-None-Match`` revalidation working across encodings.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=3, zstd_level=3):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if (response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(self.compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def compress(self, data, encoding):
+        if encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_stream(self, chunks, encoding):
+        if encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=self.zstd_level).compressobj()
+            sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            sync = zlib.Z_SYNC_FLUSH
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = compressor.compress(chunk) + compressor.flush(sync)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """Bounded LRU cache of verified JWT claims.
+
+    Entries are keyed by a SHA-256 digest of the token (raw tokens are never
+    stored) and expire at the token's ``exp`` claim, capped at ``max_ttl``
+    seconds after caching. Revoked tokens are evicted and remembered until
+    they would have expired anyway, so they can't be re-verified either.
+    """
+
+    def __init__(self, maxsize=10000, max_ttl=300.0, on_hit=None, on_miss=None):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._on_hit = on_hit
+        self._on_miss = on_miss
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """Cached claims for ``token`` or None if absent or expired"""
+        key = self.key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    if self._on_hit:
+                        self._on_hit()
+                    return claims
+                del self._entries[key]
+        if self._on_miss:
+            self._on_miss()
+        return None
+
+    def put(self, token, claims):
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        expires_at = now + self.max_ttl
+        if 'exp' in claims:
+            expires_at = min(expires_at, float(claims['exp']))
+        if expires_at <= now:
+            return
+        key = self.key(token)
+        with self._lock:
+            if key in self._revoked:
+                return
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        """Drop a cached token, e.g. after the user's permissions changed"""
+        with self._lock:
+            self._entries.pop(self.key(token), None)
+
+    def revoke(self, token, exp):
+        """Evict ``token`` and reject it until its ``exp`` timestamp"""
+        self.revoke_key(self.key(token), exp)
+
+    def revoke_key(self, key, exp):
+        """Like ``revoke`` for a token known only by its digest"""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._revoked[key] = float(exp)
+            # Forget revocations of tokens that have expired on their own
+            for k in [k for k, until in self._revoked.items() if until <= now]:
+                del self._revoked[k]
+
+    def is_revoked(self, token):
+        key = self.key(token)
+        with self._lock:
+            until = self._revoked.get(key)
+        return until is not None and time.time() < until
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
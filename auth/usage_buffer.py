@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Raised when the usage buffer stayed full for the whole wait timeout"""
+
+
+class UsageBuffer:
+    """Write-behind buffer coalescing resource accesses per ``(resource_id, user)``.
+
+    ``record`` only touches memory; a background thread hands the coalesced
+    hits to ``flush_fn(items)`` every ``interval`` seconds or as soon as
+    ``flush_size`` distinct keys are pending. At most ``max_entries`` keys are
+    held: a new key arriving at a full buffer waits up to ``timeout`` seconds
+    for a flush and then raises ``BufferFull``. A failed flush puts its hits
+    back so they are retried with the next batch, unless it raised one of
+    ``permanent_errors`` (bad data that no retry can fix): such a batch is
+    split in halves until the failing entries are isolated and dropped, and
+    ``on_drop(entries)`` is called.
+    """
+
+    def __init__(self, flush_fn, max_entries=10000, flush_size=1000, interval=0.5,
+                 timeout=1.0, on_flush=None, permanent_errors=(), on_drop=None):
+        self._flush_fn = flush_fn
+        self.max_entries = max_entries
+        self.flush_size = flush_size
+        self.interval = interval
+        self.timeout = timeout
+        self._on_flush = on_flush
+        self.permanent_errors = tuple(permanent_errors)
+        self._on_drop = on_drop
+        # (resource_id, user) -> [hits, last_access]
+        self._entries = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, resource_id, user, hits=1):
+        key = (resource_id, user)
+        now = time.time()
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    self._cond.notify_all()
+                    if not self._cond.wait_for(lambda: len(self._entries) < self.max_entries,
+                                               timeout=self.timeout):
+                        raise BufferFull('Usage buffer is full')
+                    entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [hits, now]
+            else:
+                entry[0] += hits
+                entry[1] = now
+            if len(self._entries) >= self.flush_size:
+                self._cond.notify_all()
+
+    def flush(self):
+        """Write all pending hits now; returns the number of keys flushed, None on failure"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._entries = self._entries, {}
+                self._cond.notify_all()
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            done = set()
+            try:
+                dropped = self._write([(rid, user, hits, last) for (rid, user), (hits, last) in batch.items()], done)
+            except Exception:
+                logger.exception('Usage flush of %d entries failed, will retry', len(batch) - len(done))
+                self._restore({key: value for key, value in batch.items() if key not in done})
+                return None
+            if self._on_flush:
+                self._on_flush(time.perf_counter() - started, len(batch) - dropped)
+            return len(batch) - dropped
+
+    def _write(self, items, done):
+        """Write ``items``, bisecting around permanently failing ones.
+
+        Adds every written or dropped key to ``done``; returns the number dropped.
+        """
+        try:
+            self._flush_fn(items)
+            rejected = None
+        except self.permanent_errors as e:
+            rejected = e
+        if rejected is not None and len(items) > 1:
+            middle = len(items) // 2
+            return self._write(items[:middle], done) + self._write(items[middle:], done)
+        done.update((rid, user) for rid, user, _, _ in items)
+        if rejected is None:
+            return 0
+        logger.error('Dropping usage for resource %s of %s: %s', items[0][0], items[0][1], rejected)
+        if self._on_drop:
+            self._on_drop(1)
+        return 1
+
+    def _restore(self, batch):
+        with self._cond:
+            for key, (hits, last) in batch.items():
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[0] += hits
+                    entry[1] = max(entry[1], last)
+                elif len(self._entries) < self.max_entries:
+                    self._entries[key] = [hits, last]
+                else:
+                    logger.warning('Dropping usage for resource %s: buffer full', key[0])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='usage-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or len(self._entries) >= self.flush_size,
+                                    timeout=self.interval)
+                if self._stopped:
+                    return
+            if self.flush() is None:
+                # Back off after a failed flush instead of retrying in a tight loop
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped, timeout=self.interval)
@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+
+# Applied to every SQLite connection the store opens
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-8000',
+    'PRAGMA mmap_size=67108864',
+)
+
+
+class UserStore:
+    """Shared credential logic; subclasses provide get/set/insert of password hashes"""
+
+    def __init__(self, hasher):
+        self._hasher = hasher
+
+    def check_credentials(self, email, password):
+        """Verify a password, transparently upgrading plaintext or outdated hashes"""
+        stored = self.get_password(email)
+        if stored is None:
+            return False
+        matches, needs_rehash = self._hasher.verify(password, stored)
+        if needs_rehash:
+            self.set_password(email, self._hasher.hash(password))
+        return matches
+
+    def create_user(self, email, password):
+        """Insert a user atomically; returns False if the email is already taken"""
+        return self.insert_user(email, self._hasher.hash(password))
+
+    def close(self):
+        pass
+
+
+class SQLiteUserStore(UserStore):
+    """User credentials in SQLite with one persistent connection per thread.
+
+    WAL mode lets concurrent logins read while a registration writes, and
+    reusing the connection avoids reopening the database file per request.
+    """
+
+    def __init__(self, connect, hasher):
+        super().__init__(hasher)
+        self._connect = connect
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            for pragma in SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+    def get_password(self, email):
+        """Stored password for ``email``, or None if the user does not exist"""
+        row = self._conn().execute('SELECT password FROM users WHERE email = ?', (email,)).fetchone()
+        return row[0] if row else None
+
+    def set_password(self, email, password_hash):
+        conn = self._conn()
+        conn.execute('UPDATE users SET password = ? WHERE email = ?', (password_hash, email))
+        conn.commit()
+
+    def insert_user(self, email, password_hash):
+        conn = self._conn()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO users (email, password) VALUES (?, ?) ON CONFLICT(email) DO NOTHING',
+                (email, password_hash)
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        return cursor.rowcount == 1
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class PostgresUserStore(UserStore):
+    """User credentials in the PostgreSQL ``app_users`` table via the shared pool"""
+
+    def __init__(self, pool, hasher):
+        super().__init__(hasher)
+        self._pool = pool
+
+    def get_password(self, email):
+        conn = self._pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT password FROM app_users WHERE email = %s', (email,))
+                row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            self._pool.putconn(conn)
+
+    def set_password(self, email, password_hash):
+        conn = self._pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('UPDATE app_users SET password = %s WHERE email = %s', (password_hash, email))
+            conn.commit()
+        finally:
+            self._pool.putconn(conn)
+
+    def insert_user(self, email, password_hash):
+        conn = self._pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                # Rows seeded by the generator or the usage flush have no password yet: they are claimed
+                cursor.execute(
+                    "INSERT INTO app_users (full_name, email, password) "
+                    "VALUES (split_part(%(email)s, '@', 1), %(email)s, %(password)s) "
+                    "ON CONFLICT (email) DO UPDATE SET password = excluded.password "
+                    "WHERE app_users.password IS NULL",
+                    {'email': email, 'password': password_hash}
+                )
+                created = cursor.rowcount == 1
+            conn.commit()
+            return created
+        finally:
+            self._pool.putconn(conn)
+
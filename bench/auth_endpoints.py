@@ -0,0 +1,293 @@
+"""End-to-end latency and throughput of the auth service endpoints.
+
+Runs the Flask app in-process against a temporary users.db and, unless
+``--postgres`` is given, the in-process PostgreSQL stand-in from
+``standin.py`` (every statement costs ``--db-latency-ms``). Each scenario
+drives one endpoint from ``--concurrency`` client threads, the results
+(req/s and p50/p95/p99 of the median of ``--repeat`` runs) are written as JSON and compared with a stored
+baseline; the exit code is 1 if any scenario regressed and 2 if the baseline
+was recorded with other settings or on another machine:
+
+    python bench/auth_endpoints.py --concurrency 8 --requests 2000
+    python bench/auth_endpoints.py --save-baseline     # accept the current numbers
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BENCH_DIR = os.path.join(ROOT, 'bench')
+sys.path.insert(0, os.path.join(ROOT, 'auth'))
+sys.path.insert(0, os.path.join(ROOT, 'python'))
+sys.path.insert(0, BENCH_DIR)
+
+import generator  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'auth_endpoints.baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results', 'auth_endpoints.json')
+
+EMAIL = 'bench@example.com'
+PASSWORD = 'bench-password'
+RESOURCE = {
+    'name': 'Benchmark resource', 'author': 'Bench', 'annotation': 'Created by the endpoint benchmark',
+    'kind': 'dataset', 'purpose': 'research', 'open_date': '2024-01-01', 'expiry_date': '2026-01-01',
+    'usage_conditions': 'open', 'url': 'https://example.com/bench'
+}
+
+# Changes in p95 below this many milliseconds are noise, not regressions
+P95_SLACK_MS = 0.5
+
+
+def scenarios(headers, resource_id):
+    """name -> (method, path, request kwargs, expected status, share of --requests)
+
+    Scenarios that change one resource take a function returning the kwargs of
+    each request instead, so every request gets its own row from ``resource_id()``.
+    """
+    auth = {'headers': headers}
+    return {
+        'login': ('POST', '/login', {'json': {'email': EMAIL, 'password': PASSWORD}}, 200, 0.1),
+        'verify': ('GET', '/verify', auth, 200, 1),
+        'read': ('GET', '/actions/read?limit=50', auth, 200, 1),
+        'read_columns': ('GET', '/actions/read?limit=50&format=columns', auth, 200, 1),
+        'read_cached': ('GET', '/actions/read?limit=50', auth, 200, 1),
+        'search': ('GET', '/actions/search?q=data&limit=20', auth, 200, 1),
+        'stats_top': ('GET', '/actions/stats/top?by=resources&limit=10', auth, 200, 1),
+        'create': ('POST', '/actions/create', dict(auth, json=RESOURCE), 201, 1),
+        'update': ('POST', '/actions/update',
+                   lambda: dict(auth, json={'id': resource_id(), 'name': 'Renamed'}), 200, 1),
+        'delete': ('DELETE', '/actions/delete', lambda: dict(auth, json={'id': resource_id()}), 200, 1),
+        'use': ('POST', '/actions/use', lambda: dict(auth, json={'id': resource_id()}), 202, 1),
+        'bulk_create': ('POST', '/actions/bulk/create', dict(auth, json=[RESOURCE] * 10), 201, 1),
+    }
+
+
+def run_scenario(client, method, path, kwargs, expected, concurrency, requests):
+    """Send ``requests`` requests from ``concurrency`` threads; returns (seconds, sorted latencies, bad statuses)"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            request_kwargs = kwargs() if callable(kwargs) else kwargs
+            t0 = time.perf_counter()
+            status = client.open(path, method=method, **request_kwargs).status_code
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                if status != expected:
+                    errors.append(status)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, sorted(latencies), errors
+
+
+def summarize(elapsed, latencies, errors):
+    p50, p95, p99 = (generator.percentile(latencies, q) * 1000 for q in (50, 95, 99))
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages: errors, req/s down or p95 up by more than ``tolerance``"""
+    regressions = []
+    for name, current in results.items():
+        if current['errors']:
+            regressions.append(f'{name}: {current["errors"]} unexpected responses')
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: req/s {before["rps"]} -> {current["rps"]}')
+        if (current['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                and current['p95_ms'] - before['p95_ms'] > P95_SLACK_MS):
+            regressions.append(f'{name}: p95 {before["p95_ms"]}ms -> {current["p95_ms"]}ms')
+    return regressions
+
+
+def create_resources(client, headers, count, batch_size=1000):
+    """Ids of ``count`` new resources, created through /actions/bulk/create"""
+    ids = []
+    while len(ids) < count:
+        response = client.post('/actions/bulk/create', headers=headers,
+                               json=[RESOURCE] * min(batch_size, count - len(ids)))
+        if response.status_code != 201:
+            sys.exit(f'Creating benchmark resources failed with {response.status_code}')
+        ids.extend(result['id'] for result in response.get_json()['results'])
+    return ids
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def standin_rows(count, seed):
+    """Resource rows for the stand-in, built from the generator's seeded value pools"""
+    created = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = []
+    for i, values in enumerate(generator.ValuePools(seed, size=min(count, 5000)).rows(count), start=1):
+        row = {'id': i}
+        row.update(zip(generator.RESOURCE_COLUMNS, values))
+        row['created_at'] = row['updated_at'] = created + datetime.timedelta(seconds=i)
+        rows.append(row)
+    return rows
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Auth service endpoint benchmark suite')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per scenario (login runs a tenth)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario; the median run is reported')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests before each scenario')
+    parser.add_argument('--scenarios', nargs='+', help='run only these scenarios')
+    parser.add_argument('--db-latency-ms', type=float, default=1.0, help='stand-in cost of every SQL statement')
+    parser.add_argument('--rows', type=int, default=1000, help='resource rows served by the stand-in')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scrypt-n', type=int, default=16384, help='PASSWORD_SCRYPT_N of the bench user')
+    parser.add_argument('--postgres', action='store_true',
+                        help='use the PostgreSQL from POSTGRES_* instead of the stand-in')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='results JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative drop in req/s or rise in p95 before flagging a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    output, baseline_path = os.path.abspath(args.output), os.path.abspath(args.baseline)
+    workdir = tempfile.mkdtemp(prefix='auth-bench-')
+    os.environ['USERS_DB_PATH'] = os.path.join(workdir, 'users.db')
+    os.environ['PASSWORD_SCRYPT_N'] = str(args.scrypt_n)
+    # One client address and one user drive every request; the limits would only measure 429s
+    os.environ['RATE_LIMIT_IP_RATE'] = '0'
+    os.environ['RATE_LIMIT_USER_RATE'] = '0'
+    os.chdir(os.path.join(ROOT, 'auth'))
+
+    import database
+    import main as auth
+
+    database.init_db()
+    auth.user_store.create_user(EMAIL, PASSWORD)
+    if not args.postgres:
+        from standin import StandinPool
+        auth.pg_pool = StandinPool(standin_rows(args.rows, args.seed), latency=args.db_latency_ms / 1000)
+    auth.usage_buffer.start()
+
+    client = auth.app.test_client()
+    token = client.post('/login', json={'email': EMAIL, 'password': PASSWORD}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    # Filled below; list.pop is atomic, so client threads never share a row
+    resource_ids = []
+    selected = scenarios(headers, resource_ids.pop)
+    unknown = set(args.scenarios or ()) - selected.keys()
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    selected = {name: s for name, s in selected.items() if not args.scenarios or name in args.scenarios}
+
+    def scenario_requests(share):
+        return max(args.concurrency, int(args.requests * share))
+
+    needed = sum(min(args.warmup, scenario_requests(share)) + args.repeat * scenario_requests(share)
+                 for _, _, kwargs, _, share in selected.values() if callable(kwargs))
+    resource_ids.extend(reversed(create_resources(client, headers, needed)))
+
+    results = {}
+    cache_size = auth.response_cache.maxsize
+    print(f'{"scenario":<14} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>7}')
+    try:
+        for name, (method, path, kwargs, expected, share) in selected.items():
+            # Only read_cached may be answered from the response cache
+            auth.response_cache.clear()
+            auth.response_cache.maxsize = cache_size if name == 'read_cached' else 0
+            requests = scenario_requests(share)
+            run_scenario(client, method, path, kwargs, expected, args.concurrency,
+                         min(args.warmup, requests))
+            runs = sorted((summarize(*run_scenario(client, method, path, kwargs, expected,
+                                                   args.concurrency, requests))
+                           for _ in range(args.repeat)), key=lambda r: r['rps'])
+            result = dict(runs[len(runs) // 2], errors=sum(r['errors'] for r in runs))
+            results[name] = result
+            print(f'{name:<14} {result["rps"]:>9.1f} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+                  f'{result["p99_ms"]:>9.2f} {result["errors"]:>7}')
+    finally:
+        auth.response_cache.maxsize = cache_size
+        auth.usage_buffer.stop()
+
+    report = {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'backend': 'postgres' if args.postgres else 'standin',
+            'db_latency_ms': None if args.postgres else args.db_latency_ms,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'repeat': args.repeat,
+            'scrypt_n': args.scrypt_n,
+        },
+        'results': results,
+    }
+    write_json(output, report)
+    print(f'Results written to {output}')
+
+    if args.save_baseline:
+        write_json(baseline_path, report)
+        print(f'Baseline saved to {baseline_path}')
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f'No baseline at {baseline_path}; run with --save-baseline to create one')
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    settings = ('backend', 'db_latency_ms', 'concurrency', 'scrypt_n', 'cpus', 'platform')
+    changed = [s for s in settings if baseline['meta'].get(s) != report['meta'][s]]
+    if changed:
+        # Numbers from another machine or configuration are not comparable
+        print(f'Baseline {baseline_path} was recorded with different {", ".join(changed)}; '
+              f'run with --save-baseline to record one here')
+        return 2
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for message in regressions:
+        print(f'REGRESSION {message}')
+    if not regressions:
+        print(f'No regressions against {baseline_path} (tolerance {args.tolerance:.0%})')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
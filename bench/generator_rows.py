@@ -0,0 +1,67 @@
+"""Rows/sec of resource row generation with and without the value pools.
+
+Times per-row Faker calls (the generator's previous path) against rows
+assembled from seeded value pools, reports the one-off pool build cost, and
+checks that two pool sets built from the same seed produce identical data:
+
+    python bench/generator_rows.py --rows 100000 --batch-size 5000 --seed 42
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'python'))
+
+import generator  # noqa: E402
+
+
+def generate(make_batch, rows, batch_size):
+    """Generate ``rows`` rows in batches; returns (seconds, digest of the rows)"""
+    digest = hashlib.sha256()
+    seconds = 0.0
+    done = 0
+    while done < rows:
+        n = min(batch_size, rows - done)
+        t0 = time.perf_counter()
+        batch = make_batch(n)
+        seconds += time.perf_counter() - t0
+        digest.update(repr(batch).encode())
+        done += n
+    return seconds, digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generator row throughput')
+    parser.add_argument('--rows', type=int, default=100_000, help='rows generated with the value pools')
+    parser.add_argument('--faker-rows', type=int, default=10_000,
+                        help='rows generated with per-row Faker calls (slow, so fewer by default)')
+    parser.add_argument('--batch-size', type=int, default=5_000, help='rows per batch, as in bulk mode')
+    parser.add_argument('--pool-size', type=int, default=5_000, help='value pool size')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generator.random.seed(args.seed)
+    generator.fake.seed_instance(args.seed)
+    faker_seconds, _ = generate(lambda n: [generator.fake_resource_row() for _ in range(n)],
+                                args.faker_rows, args.batch_size)
+
+    t0 = time.perf_counter()
+    pools = generator.ValuePools(args.seed, args.pool_size)
+    build_seconds = time.perf_counter() - t0
+    pool_seconds, digest = generate(pools.rows, args.rows, args.batch_size)
+    _, again = generate(generator.ValuePools(args.seed, args.pool_size).rows, args.rows, args.batch_size)
+
+    faker_rate = args.faker_rows / faker_seconds
+    pool_rate = args.rows / pool_seconds
+    print(f'{"path":<14} {"rows":>9} {"seconds":>9} {"rows/sec":>11}')
+    print(f'{"faker":<14} {args.faker_rows:>9} {faker_seconds:>9.2f} {faker_rate:>11.0f}')
+    print(f'{"value pools":<14} {args.rows:>9} {pool_seconds:>9.2f} {pool_rate:>11.0f}')
+    print(f'pool build {build_seconds:.2f}s (size {args.pool_size}), speedup x{pool_rate / faker_rate:.0f}')
+    print(f'seed {args.seed}: digest {digest[:16]}, reproducible: {"yes" if digest == again else "NO"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Login throughput of the auth service at different scrypt cost settings.
+
+Runs the Flask app in-process against a temporary users.db and drives
+/login from a pool of client threads:
+
+    python bench/login_throughput.py --costs 12 14 15 --concurrency 8 --requests 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+AUTH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'auth')
+
+from auth_endpoints import run_scenario, summarize  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput vs scrypt cost')
+    parser.add_argument('--costs', type=int, nargs='+', default=[12, 14, 15],
+                        help='scrypt N as powers of two')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=0, help='KDF pool size (0 = CPU count)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='login-bench-')
+    os.environ['USERS_DB_PATH'] = os.path.join(workdir, 'users.db')
+    # Every request comes from one address; the per-IP limit would only measure 429s
+    os.environ['RATE_LIMIT_IP_RATE'] = '0'
+    sys.path.insert(0, AUTH_DIR)
+    os.chdir(AUTH_DIR)
+
+    import database
+    import main as auth
+    from passwords import PasswordHasher
+    from user_store import SQLiteUserStore
+
+    database.init_db()
+    client = auth.app.test_client()
+
+    print(f'{"scrypt N":>10} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>7}')
+    for cost in args.costs:
+        hasher = PasswordHasher(n=2 ** cost, workers=args.workers or None)
+        auth.user_store = SQLiteUserStore(auth.get_db_connection, hasher)
+        email = f'bench-{cost}@example.com'
+        auth.user_store.create_user(email, 'bench-password')
+
+        result = summarize(*run_scenario(client, 'POST', '/login',
+                                         {'json': {'email': email, 'password': 'bench-password'}}, 200,
+                                         args.concurrency, args.requests))
+        print(f'{2 ** cost:>10} {result["rps"]:>9.1f} {result["p50_ms"]:>9.1f} {result["p95_ms"]:>9.1f} '
+              f'{result["p99_ms"]:>9.1f} {result["errors"]:>7}')
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Serialization and compression cost of large /actions/read responses.
+
+Builds generator-style resource rows (text-heavy annotations) and compares
+the previous path - a dict per row encoded by Flask's default provider -
+with the orjson provider on dict rows and on column-oriented tuple rows,
+then the cost and ratio of gzip/zstd on the resulting body:
+
+    python bench/response_serialization.py --rows 10000 100000 --repeat 5
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'auth'))
+sys.path.insert(0, os.path.join(ROOT, 'python'))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import generator  # noqa: E402
+from queries import RESOURCE_COLUMNS  # noqa: E402
+from serialization import Compressor, FastJSONProvider, available_encodings, orjson  # noqa: E402
+
+# Distinct rows generated with Faker; larger results cycle through them
+UNIQUE_ROWS = 2000
+
+
+def make_rows(count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    unique = [generator.fake_resource_row() for _ in range(min(count, UNIQUE_ROWS))]
+    rows = []
+    for i in range(count):
+        created = now - datetime.timedelta(seconds=i)
+        # Same column order as RESOURCE_COLUMNS
+        rows.append((count - i, *unique[i % len(unique)], created, created))
+    return rows
+
+
+def best_of(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Response serialization and compression benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    generator.fake.seed_instance(args.seed)
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    compressor = Compressor()
+    columns = list(RESOURCE_COLUMNS)
+
+    print(f'JSON encoder: {"orjson " + orjson.__version__ if orjson else "json (orjson not installed)"}')
+    for count in args.rows:
+        rows = make_rows(count)
+        message = 'Resources retrieved successfully'
+
+        def default_path():
+            data = [dict(zip(columns, row)) for row in rows]
+            return default_provider.response({'message': message, 'data': data, 'next_cursor': None}).get_data()
+
+        def fast_rows():
+            data = [dict(zip(columns, row)) for row in rows]
+            return fast_provider.response({'message': message, 'data': data, 'next_cursor': None}).get_data()
+
+        def fast_columns():
+            return fast_provider.response({'message': message, 'columns': columns, 'rows': rows,
+                                           'next_cursor': None}).get_data()
+
+        print(f'\n{count} rows')
+        print(f'{"path":<34} {"ms":>9} {"MB":>8} {"vs default":>11}')
+        with app.app_context():
+            baseline, _ = best_of(default_path, args.repeat)
+            results = [('flask default, dict rows', baseline, default_path())]
+            for name, fn in (('fast encoder, dict rows', fast_rows), ('fast encoder, columns', fast_columns)):
+                seconds, body = best_of(fn, args.repeat)
+                results.append((name, seconds, body))
+        for name, seconds, body in results:
+            print(f'{name:<34} {seconds * 1000:>9.1f} {len(body) / 1e6:>8.2f} {baseline / seconds:>10.1f}x')
+
+        body = results[-1][2]
+        print(f'{"compression of columns body":<34} {"ms":>9} {"MB":>8} {"ratio":>11}')
+        for encoding in available_encodings():
+            seconds, compressed = best_of(lambda: compressor.compress(body, encoding), args.repeat)
+            print(f'{encoding:<34} {seconds * 1000:>9.1f} {len(compressed) / 1e6:>8.2f} '
+                  f'{len(body) / len(compressed):>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
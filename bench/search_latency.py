@@ -0,0 +1,128 @@
+"""Latency of /actions/search queries over a large resources table.
+
+Tops the table up to ``--rows`` resources with the generator's bulk loader,
+then times the exact SQL the endpoint runs (text and fuzzy modes, first and
+next page) against an unindexed ILIKE scan as the baseline:
+
+    python bench/search_latency.py --rows 1000000 --terms 20 --repeat 5 --seed 42
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'auth'))
+sys.path.insert(0, os.path.join(ROOT, 'python'))
+
+import psycopg  # noqa: E402
+from psycopg.rows import dict_row  # noqa: E402
+
+import generator  # noqa: E402
+from queries import build_search_query, encode_search_cursor  # noqa: E402
+
+BASELINE_SQL = """
+    SELECT id, name FROM resources
+    WHERE name ILIKE %(pattern)s OR annotation ILIKE %(pattern)s
+    ORDER BY id DESC LIMIT %(limit)s
+"""
+
+
+def ensure_rows(conn, rows, batch_size, seed=None):
+    with conn.cursor() as cur:
+        cur.execute("select count(*) from resources")
+        (have,) = cur.fetchone()
+    if have < rows:
+        print(f'Loading {rows - have} resources ({have} present)...')
+        # Without value pools every row would be built by Faker, many times slower
+        generator.init_pools(seed)
+        generator.run_bulk(conn, rows - have, batch_size, usage_per_row=0)
+        with conn.cursor() as cur:
+            cur.execute("analyze resources")
+        conn.commit()
+    return max(have, rows)
+
+
+def sample_words(conn, count):
+    """Distinct words from existing names, so every term has matches"""
+    with conn.cursor() as cur:
+        cur.execute("select name from resources tablesample system (1) limit 1000")
+        words = {w.lower() for (name,) in cur.fetchall() for w in name.split()[:-1] if len(w) > 3}
+    return random.sample(sorted(words), min(count, len(words)))
+
+
+def typo(word):
+    i = random.randrange(1, len(word))
+    return word[:i] + word[i + 1:]
+
+
+def timed(conn, query, params, repeat):
+    latencies = []
+    rows = []
+    with conn.cursor(row_factory=dict_row) as cur:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            cur.execute(query, params)
+            rows = cur.fetchall()
+            latencies.append(time.perf_counter() - t0)
+    return latencies, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/actions/search query latency')
+    parser.add_argument('--dsn', help='Postgres DSN (defaults to DB_DSN / POSTGRES_* like the generator)')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='minimum resources in the table')
+    parser.add_argument('--batch-size', type=int, default=20_000, help='COPY batch size when loading')
+    parser.add_argument('--terms', type=int, default=20, help='search terms sampled from the data')
+    parser.add_argument('--repeat', type=int, default=5, help='executions per term')
+    parser.add_argument('--limit', type=int, default=100, help='page size')
+    parser.add_argument('--seed', type=int, help='seed for the loaded rows and the sampled terms')
+    parser.add_argument('--no-baseline', action='store_true', help='skip the ILIKE full-scan baseline')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with psycopg.connect(generator.build_dsn(args)) as conn:
+        total = ensure_rows(conn, args.rows, args.batch_size, args.seed)
+        words = sample_words(conn, args.terms)
+        if len(words) < 2:
+            sys.exit('Not enough data to sample search terms')
+
+        scenarios = {
+            'text: one word': [{'q': w} for w in words],
+            'text: two words': [{'q': f'{a} {b}'} for a, b in zip(words, words[1:])],
+            'fuzzy: typo': [{'q': typo(w), 'mode': 'fuzzy'} for w in words],
+            'fuzzy: prefix': [{'q': w[:4], 'mode': 'fuzzy'} for w in words],
+        }
+        results = {}
+        for name, cases in scenarios.items():
+            first, following = [], []
+            for case in cases:
+                query, params, _ = build_search_query(case, args.limit)
+                latencies, rows = timed(conn, query, params, args.repeat)
+                first.extend(latencies)
+                if len(rows) == args.limit:
+                    query, params, _ = build_search_query(
+                        dict(case, cursor=encode_search_cursor(rows[-1])), args.limit)
+                    following.extend(timed(conn, query, params, args.repeat)[0])
+            results[name + ' (page 1)'] = first
+            if following:
+                results[name + ' (page 2)'] = following
+
+        if not args.no_baseline:
+            results['baseline: ILIKE scan'] = [
+                t for w in words
+                for t in timed(conn, BASELINE_SQL, {'pattern': f'%{w}%', 'limit': args.limit},
+                               max(1, args.repeat // 2))[0]
+            ]
+
+    print(f'{total} resources, {len(words)} terms x {args.repeat} runs, limit {args.limit}')
+    print(f'{"scenario":<28} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+    for name, latencies in results.items():
+        ordered = sorted(latencies)
+        p50, p95, p99 = (generator.percentile(ordered, q) * 1000 for q in (50, 95, 99))
+        print(f'{name:<28} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {ordered[-1] * 1000:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
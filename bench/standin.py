@@ -0,0 +1,212 @@
+"""In-process stand-in for the PostgreSQL pool of the auth service.
+
+Benchmarks swap ``main.pg_pool`` for a ``StandinPool`` to measure the
+service itself - routing, auth, admission, SQL building, serialization -
+without a database. Every statement sleeps ``latency`` seconds (releasing
+the GIL, like a network round trip) and answers from a fixed set of
+generated resource rows:
+
+* SELECT returns ``LIMIT`` rows (the whole data set without one) with the
+  columns of its select list, aliases included;
+* INSERT/UPDATE/DELETE report one affected row per VALUES tuple or id;
+  ``RETURNING`` yields fresh ids for inserts and the given ids otherwise.
+
+Statements still go through the SQL instrumentation, so their metrics and
+the 'query' phase cost what they cost in production.
+"""
+import datetime
+import itertools
+import re
+import threading
+import time
+from functools import lru_cache
+
+from psycopg2.extensions import adapt
+
+import instrumentation
+
+_ALIAS = re.compile(r'\bAS\s+(\w+)\s*$', re.IGNORECASE)
+
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Columns that are not in resources, by name
+EXTRA_VALUES = {
+    'rank': lambda i: round(1.0 / (i + 1), 6),
+    'usage_count': lambda i: 10_000 - i,
+    'users': lambda i: 100 - i % 100,
+    'resources': lambda i: 100 - i % 100,
+    'email': lambda i: f'user{i}@example.com',
+    'full_name': lambda i: f'User {i}',
+    'day': lambda i: (EPOCH - datetime.timedelta(days=i)).date(),
+    'last_access': lambda i: EPOCH - datetime.timedelta(minutes=i),
+    'change_xid': lambda i: str(1000 + i),
+    'horizon': lambda i: '100000',
+    'pruned': lambda i: '0',
+}
+
+
+def quote(value):
+    """SQL literal of ``value`` as psycopg2 renders it, without a connection"""
+    adapted = adapt(value)
+    if hasattr(adapted, 'encoding'):
+        adapted.encoding = 'utf8'
+    return adapted.getquoted()
+
+
+def _column_name(expression):
+    alias = _ALIAS.search(expression)
+    if alias:
+        return alias.group(1)
+    return expression.strip().rsplit('.', 1)[-1]
+
+
+@lru_cache(maxsize=256)
+def select_columns(query):
+    """Output column names of a SELECT (top-level select list only)"""
+    body = query.strip()[len('SELECT'):]
+    upper = body.upper()
+    columns = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(body):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and char == ',':
+            columns.append(body[start:i])
+            start = i + 1
+        elif depth == 0 and upper.startswith('FROM', i) and body[i - 1].isspace():
+            break
+    else:
+        i = len(body)
+    columns.append(body[start:i])
+    return tuple(_column_name(c) for c in columns)
+
+
+class StandinCursor:
+    def __init__(self, connection, as_dict):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.rowcount = -1
+        self.itersize = 2000
+        self._rows = []
+        self._position = 0
+        self._values = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def mogrify(self, query, args=None):
+        # Only reached through execute_values: remember the VALUES tuples of the next statement
+        # and render them like psycopg2 would, so the statement text has its real size
+        self._values.append(args)
+        if isinstance(query, str):
+            query = query.encode()
+        return query % tuple(quote(value) for value in args)
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        text = query.decode() if isinstance(query, bytes) else str(query)
+        time.sleep(self.connection.pool.latency)
+        self._rows, self.rowcount = self.connection.pool.answer(text, vars, self._values, self.as_dict)
+        self._position = 0
+        self._values = []
+        instrumentation.observe_statement(query, vars, time.perf_counter() - started, self.rowcount)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=None):
+        size = size or self.itersize
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class StandinConnection:
+    encoding = 'UTF8'
+    closed = 0
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self, name=None, cursor_factory=None):
+        # RealDictCursor is the only cursor_factory the service uses
+        return StandinCursor(self, as_dict=cursor_factory is not None)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class StandinPool:
+    """Drop-in for ``PostgresPool`` serving ``rows`` (dicts of resource columns)"""
+
+    def __init__(self, rows, latency=0.001):
+        self.rows = rows
+        self.latency = latency
+        self.in_use = 0
+        self._ids = itertools.count(len(rows) + 1)
+        self._lock = threading.Lock()
+
+    @property
+    def idle(self):
+        return 0
+
+    def getconn(self):
+        with self._lock:
+            self.in_use += 1
+        return StandinConnection(self)
+
+    def putconn(self, conn, close=False):
+        with self._lock:
+            self.in_use -= 1
+
+    def closeall(self):
+        pass
+
+    def value(self, column, i):
+        row = self.rows[i % len(self.rows)]
+        if column in row:
+            return row[column]
+        extra = EXTRA_VALUES.get(column)
+        return extra(i) if extra else i
+
+    def answer(self, query, params, values, as_dict):
+        """(rows, rowcount) of ``query``; ``values`` are the tuples an execute_values call mogrified"""
+        statement = query.lstrip().upper()
+        if statement.startswith('SELECT'):
+            columns = select_columns(query.strip())
+            if isinstance(params, dict) and params.get('limit') is not None:
+                count = params['limit']
+            elif ' FROM RESOURCES' in statement:
+                count = len(self.rows)
+            else:
+                count = 1
+            rows = [tuple(self.value(c, i) for c in columns) for i in range(count)]
+            return ([dict(zip(columns, row)) for row in rows] if as_dict else rows), count
+        lists = [p for p in params if isinstance(p, list)] if isinstance(params, tuple) else []
+        if lists:
+            ids = lists[0]
+        elif values and not statement.startswith('INSERT'):
+            ids = [v[0] for v in values]
+        else:
+            ids = [next(self._ids) for _ in range(max(1, len(values)))]
+        if 'RETURNING' not in statement:
+            return [], len(ids)
+        return ([{'id': i} for i in ids] if as_dict else [(i,) for i in ids]), len(ids)
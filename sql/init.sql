@@ -19,6 +19,9 @@ create table if not exists app_users (
   email      text unique
 );
 
+-- облікові дані для auth-сервісу при USER_STORE=postgres
+alter table app_users add column if not exists password text;
+
 create table if not exists usage_stats (
   id           bigserial primary key,
   resource_id  bigint not null references resources(id) on delete cascade,
@@ -56,3 +59,395 @@ on conflict do nothing;
 create index if not exists idx_resources_updated_at on resources (updated_at desc);
 create index if not exists idx_usage_stats_res on usage_stats (resource_id);
 create index if not exists idx_usage_stats_user on usage_stats (user_id);
+
+-- keyset pagination for /actions/read: order by (created_at, id) and filters on kind/purpose/usage_conditions
+create index if not exists idx_resources_created_id on resources (created_at desc, id desc);
+create index if not exists idx_resources_kind_created on resources (kind, created_at desc, id desc);
+create index if not exists idx_resources_purpose_created on resources (purpose, created_at desc, id desc);
+create index if not exists idx_resources_conditions_created on resources (usage_conditions, created_at desc, id desc);
+
+-- повнотекстовий пошук для /actions/search: name важливіший за annotation
+alter table resources add column if not exists search_vector tsvector
+  generated always as (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(annotation, '')), 'B')
+  ) stored;
+create index if not exists idx_resources_search on resources using gin (search_vector);
+
+-- триграми для префіксного та нечіткого пошуку за name/author (mode=fuzzy)
+create extension if not exists pg_trgm;
+create index if not exists idx_resources_name_trgm on resources using gin (name gin_trgm_ops);
+create index if not exists idx_resources_author_trgm on resources using gin (author gin_trgm_ops);
+
+-- сповіщення про зміни resources для інвалідації кешу читання в auth-сервісі;
+-- один NOTIFY на statement, ids = null якщо змінено більше 500 рядків
+create or replace function notify_resources_changed() returns trigger as $$
+declare
+  ids bigint[];
+begin
+  if tg_op = 'DELETE' then
+    select array_agg(id) into ids from (select id from old_rows limit 501) t;
+  else
+    select array_agg(id) into ids from (select id from new_rows limit 501) t;
+  end if;
+  if ids is null then
+    return null;
+  end if;
+  perform pg_notify('resources_changed', json_build_object(
+    'op', lower(tg_op),
+    'ids', case when array_length(ids, 1) > 500 then null else ids end
+  )::text);
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_resources_notify_ins on resources;
+create trigger trg_resources_notify_ins
+after insert on resources
+referencing new table as new_rows
+for each statement execute function notify_resources_changed();
+
+drop trigger if exists trg_resources_notify_upd on resources;
+create trigger trg_resources_notify_upd
+after update on resources
+referencing new table as new_rows
+for each statement execute function notify_resources_changed();
+
+drop trigger if exists trg_resources_notify_del on resources;
+create trigger trg_resources_notify_del
+after delete on resources
+referencing old table as old_rows
+for each statement execute function notify_resources_changed();
+
+-- журнал змін для /actions/changes: кожен рядок resources знає id транзакції, що записала його останньою.
+-- Фід віддає лише зміни транзакцій старших за xmin поточного знімка - вони вже завершені,
+-- тож нижче курсора клієнта нова зміна з'явитися не може (на відміну від updated_at = час початку транзакції)
+alter table resources add column if not exists change_xid xid8 not null default pg_current_xact_id();
+create index if not exists idx_resources_change on resources (change_xid, id);
+
+create or replace function set_change_xid() returns trigger as $$
+begin
+  new.change_xid = pg_current_xact_id();
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_resources_change_xid on resources;
+create trigger trg_resources_change_xid
+before insert or update on resources
+for each row execute function set_change_xid();
+
+-- tombstone'и видалених ресурсів; старші за app.tombstone_retention (7 днів) видаляються,
+-- а change_feed_horizon запам'ятовує найстаршу межу, до якої курсори ще валідні
+create table if not exists resource_tombstones (
+  resource_id  bigint not null,
+  change_xid   xid8 not null default pg_current_xact_id(),
+  deleted_at   timestamptz not null default now()
+);
+create index if not exists idx_resource_tombstones_change on resource_tombstones (change_xid, resource_id);
+create index if not exists idx_resource_tombstones_deleted_at on resource_tombstones (deleted_at);
+
+create table if not exists change_feed_horizon (
+  id          boolean primary key default true check (id),
+  pruned_xid  xid8 not null default '0'
+);
+insert into change_feed_horizon default values on conflict do nothing;
+
+create or replace function capture_resource_tombstones() returns trigger as $$
+declare
+  pruned xid8;
+begin
+  insert into resource_tombstones (resource_id) select id from old_rows;
+
+  with gone as (
+    delete from resource_tombstones
+    where deleted_at < now() - coalesce(nullif(current_setting('app.tombstone_retention', true), ''), '7 days')::interval
+    returning change_xid
+  )
+  select max(change_xid) into pruned from gone;
+  if pruned is not null then
+    update change_feed_horizon set pruned_xid = greatest(pruned_xid, pruned);
+  end if;
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_resources_tombstones on resources;
+create trigger trg_resources_tombstones
+after delete on resources
+referencing old table as old_rows
+for each statement execute function capture_resource_tombstones();
+
+-- відкликані JWT токени (sha256 токена), щоб усі воркери auth-сервісу відхиляли їх до exp
+create table if not exists revoked_tokens (
+  token_key   bytea primary key,
+  expires_at  timestamptz not null
+);
+
+-- інкрементальні агрегати usage_stats для /actions/stats/top: оновлюються statement-тригерами
+-- з різниці old/new рядків, тож top-N читається з маленьких таблиць замість group by по usage_stats
+create table if not exists usage_rollup_resource (
+  resource_id  bigint primary key,
+  kind         text,
+  purpose      text,
+  usage_count  bigint  not null default 0,
+  users        integer not null default 0,
+  last_access  timestamptz
+);
+
+create table if not exists usage_rollup_user (
+  user_id      bigint primary key,
+  usage_count  bigint  not null default 0,
+  resources    integer not null default 0,
+  last_access  timestamptz
+);
+
+create table if not exists usage_rollup_kind (
+  kind         text,
+  purpose      text,
+  usage_count  bigint not null default 0,
+  unique nulls not distinct (kind, purpose)
+);
+
+-- приріст usage_count за день; видалення usage_stats історію днів не змінює
+create table if not exists usage_rollup_daily (
+  day          date primary key,
+  usage_count  bigint not null default 0
+);
+
+create index if not exists idx_usage_rollup_resource_top on usage_rollup_resource (usage_count desc, resource_id);
+create index if not exists idx_usage_rollup_user_top on usage_rollup_user (usage_count desc, user_id);
+
+create or replace function usage_stats_rollup() returns trigger as $$
+declare
+  d_res  bigint[];
+  d_user bigint[];
+  d_hits bigint[];
+  d_rows integer[];
+  d_last timestamptz[];
+begin
+  -- дельта змінених рядків: нові зі знаком +, старі зі знаком -
+  if tg_op = 'INSERT' then
+    select array_agg(resource_id), array_agg(user_id), array_agg(usage_count::bigint),
+           array_agg(1), array_agg(last_access)
+      into d_res, d_user, d_hits, d_rows, d_last
+      from new_rows;
+  elsif tg_op = 'UPDATE' then
+    select array_agg(resource_id), array_agg(user_id), array_agg(hits), array_agg(n), array_agg(last_access)
+      into d_res, d_user, d_hits, d_rows, d_last
+      from (
+        select resource_id, user_id, usage_count::bigint as hits, 1 as n, last_access from new_rows
+        union all
+        select resource_id, user_id, -usage_count::bigint, -1, null from old_rows
+      ) t;
+  else
+    select array_agg(resource_id), array_agg(user_id), array_agg(-usage_count::bigint),
+           array_agg(-1), array_agg(null::timestamptz)
+      into d_res, d_user, d_hits, d_rows, d_last
+      from old_rows;
+  end if;
+  if d_res is null then
+    return null;
+  end if;
+
+  -- kind/purpose беремо з usage_rollup_resource: при каскадному видаленні ресурсу рядка в resources вже немає;
+  -- ключі оновлюються в стабільному порядку, щоб паралельні транзакції не блокували одна одну навхрест
+  with d as (
+    select * from unnest(d_res, d_user, d_hits, d_rows, d_last) as t(resource_id, user_id, hits, n, last_access)
+  ), by_resource as (
+    select d.resource_id,
+           case when rr.resource_id is null then res.kind else rr.kind end as kind,
+           case when rr.resource_id is null then res.purpose else rr.purpose end as purpose,
+           sum(d.hits) as hits, sum(d.n) as n, max(d.last_access) as last_access
+    from d
+    left join usage_rollup_resource rr on rr.resource_id = d.resource_id
+    left join resources res on res.id = d.resource_id
+    group by 1, 2, 3
+  ), upd_resource as (
+    insert into usage_rollup_resource as r (resource_id, kind, purpose, usage_count, users, last_access)
+    select resource_id, kind, purpose, hits, n, last_access from by_resource order by resource_id
+    on conflict (resource_id) do update
+      set usage_count = r.usage_count + excluded.usage_count,
+          users       = r.users + excluded.users,
+          last_access = greatest(r.last_access, excluded.last_access)
+  ), upd_user as (
+    insert into usage_rollup_user as u (user_id, usage_count, resources, last_access)
+    select user_id, sum(hits), sum(n), max(last_access) from d group by user_id order by user_id
+    on conflict (user_id) do update
+      set usage_count = u.usage_count + excluded.usage_count,
+          resources   = u.resources + excluded.resources,
+          last_access = greatest(u.last_access, excluded.last_access)
+  ), upd_daily as (
+    insert into usage_rollup_daily as dd (day, usage_count)
+    select current_date, sum(hits) from d having tg_op <> 'DELETE' and sum(hits) <> 0
+    on conflict (day) do update set usage_count = dd.usage_count + excluded.usage_count
+  )
+  insert into usage_rollup_kind as k (kind, purpose, usage_count)
+  select kind, purpose, sum(hits) from by_resource group by kind, purpose order by kind, purpose
+  on conflict (kind, purpose) do update set usage_count = k.usage_count + excluded.usage_count;
+
+  if tg_op <> 'INSERT' then
+    delete from usage_rollup_resource where resource_id = any(d_res) and users <= 0;
+    delete from usage_rollup_user where user_id = any(d_user) and resources <= 0;
+  end if;
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_usage_stats_rollup_ins on usage_stats;
+create trigger trg_usage_stats_rollup_ins
+after insert on usage_stats
+referencing new table as new_rows
+for each statement execute function usage_stats_rollup();
+
+drop trigger if exists trg_usage_stats_rollup_upd on usage_stats;
+create trigger trg_usage_stats_rollup_upd
+after update on usage_stats
+referencing old table as old_rows new table as new_rows
+for each statement execute function usage_stats_rollup();
+
+drop trigger if exists trg_usage_stats_rollup_del on usage_stats;
+create trigger trg_usage_stats_rollup_del
+after delete on usage_stats
+referencing old table as old_rows
+for each statement execute function usage_stats_rollup();
+
+-- зміна kind/purpose ресурсу переносить його лічильник між рядками usage_rollup_kind
+create or replace function usage_rollup_resource_moved() returns trigger as $$
+begin
+  with moved as (
+    select rr.resource_id, rr.kind as old_kind, rr.purpose as old_purpose,
+           n.kind, n.purpose, rr.usage_count
+    from new_rows n
+    join usage_rollup_resource rr on rr.resource_id = n.id
+    where (n.kind, n.purpose) is distinct from (rr.kind, rr.purpose)
+  ), upd_resource as (
+    update usage_rollup_resource rr
+       set kind = m.kind, purpose = m.purpose
+      from moved m
+     where rr.resource_id = m.resource_id
+  )
+  insert into usage_rollup_kind as k (kind, purpose, usage_count)
+  select kind, purpose, sum(delta) from (
+    select old_kind, old_purpose, -usage_count from moved
+    union all
+    select kind, purpose, usage_count from moved
+  ) t (kind, purpose, delta)
+  group by kind, purpose order by kind, purpose
+  on conflict (kind, purpose) do update set usage_count = k.usage_count + excluded.usage_count;
+  return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_resources_rollup_upd on resources;
+create trigger trg_resources_rollup_upd
+after update on resources
+referencing new table as new_rows
+for each statement execute function usage_rollup_resource_moved();
+
+-- повний перерахунок агрегатів з usage_stats (початкове заповнення або перевірка розбіжностей);
+-- usage_rollup_daily не чіпає - щоденний приріст з usage_stats не відновити
+create or replace function rebuild_usage_rollups() returns void as $$
+begin
+  lock table usage_stats in share mode;
+  truncate usage_rollup_resource, usage_rollup_user, usage_rollup_kind;
+
+  insert into usage_rollup_resource (resource_id, kind, purpose, usage_count, users, last_access)
+  select s.resource_id, r.kind, r.purpose, sum(s.usage_count), count(*), max(s.last_access)
+  from usage_stats s join resources r on r.id = s.resource_id
+  group by s.resource_id, r.kind, r.purpose;
+
+  insert into usage_rollup_user (user_id, usage_count, resources, last_access)
+  select user_id, sum(usage_count), count(*), max(last_access)
+  from usage_stats group by user_id;
+
+  insert into usage_rollup_kind (kind, purpose, usage_count)
+  select kind, purpose, sum(usage_count)
+  from usage_rollup_resource group by kind, purpose;
+end;
+$$ language plpgsql;
+
+select rebuild_usage_rollups() where not exists (select 1 from usage_rollup_resource);
+
+-- retention: python/retention.py переносить прострочені ресурси та давні usage_stats в архів
+-- невеликими пачками; індекси, щоб вибір пачки не сканував таблиці
+create index if not exists idx_resources_expiry on resources (expiry_date);
+create index if not exists idx_usage_stats_last_access on usage_stats (last_access);
+
+-- архівні таблиці секціоновані за місяцем архівації: старі місяці видаляються
+-- миттєво (drop table секції) замість delete по рядках
+create table if not exists resources_archive (
+  id            bigint      not null,
+  name          text        not null,
+  author        text,
+  annotation    text,
+  kind          text,
+  purpose       text,
+  open_date     date,
+  expiry_date   date,
+  usage_conditions text,
+  url           text,
+  created_at    timestamptz not null,
+  updated_at    timestamptz not null,
+  archived_at   timestamptz not null default now()
+) partition by range (archived_at);
+
+-- reason: 'stale' (давнє звернення) або 'resource_expired' (разом з архівованим ресурсом)
+create table if not exists usage_stats_archive (
+  id           bigint      not null,
+  resource_id  bigint      not null,
+  user_id      bigint      not null,
+  usage_count  integer     not null,
+  last_access  timestamptz,
+  created_at   timestamptz not null,
+  updated_at   timestamptz not null,
+  reason       text        not null,
+  archived_at  timestamptz not null default now()
+) partition by range (archived_at);
+
+create index if not exists idx_resources_archive_id on resources_archive (id);
+create index if not exists idx_usage_stats_archive_resource on usage_stats_archive (resource_id);
+
+-- секції <таблиця>_pYYYYMM на поточний і months_ahead наступних місяців
+create or replace function ensure_archive_partitions(months_ahead integer default 1) returns void as $$
+declare
+  parent text;
+  month  date;
+begin
+  foreach parent in array array['resources_archive', 'usage_stats_archive'] loop
+    for i in 0..months_ahead loop
+      month := (date_trunc('month', now()) + make_interval(months => i))::date;
+      execute format(
+        'create table if not exists %I partition of %I for values from (%L) to (%L)',
+        parent || '_p' || to_char(month, 'YYYYMM'), parent, month, (month + interval '1 month')::date
+      );
+    end loop;
+  end loop;
+end;
+$$ language plpgsql;
+
+-- видаляє секції архіву, що повністю старші за keep; з dry_run лише повертає їх імена
+create or replace function drop_archive_partitions(keep interval, dry_run boolean default false)
+returns setof text as $$
+declare
+  part record;
+begin
+  for part in
+    select c.relname
+    from pg_inherits i
+    join pg_class c on c.oid = i.inhrelid
+    join pg_class p on p.oid = i.inhparent
+    where p.relname in ('resources_archive', 'usage_stats_archive')
+      and c.relname ~ '_p\d{6}$'
+      and to_date(right(c.relname, 6), 'YYYYMM') + interval '1 month' <= now() - keep
+    order by c.relname
+  loop
+    if not dry_run then
+      execute format('drop table %I', part.relname);
+    end if;
+    return next part.relname;
+  end loop;
+end;
+$$ language plpgsql;
+
+select ensure_archive_partitions();